@@ -1,6 +1,7 @@
 import io
+import queue
 import sys
-import requests
+import threading
 from typing import List, Optional
 
 from data.data import (
@@ -9,16 +10,22 @@ from data.data import (
     CONTACTS,
     POSITIONS,
     LOCATIONS,
+    CSE_PAGE_SIZE,
+    CSE_PAGE_QUEUE_SIZE,
+    CSE_TIMEOUT,
 )
-from espo_request import get_lead, clients, create_prospect
+from espo_request import is_known_prospect, clients, create_prospect
+from storage import cse_quota
 from searching_service import (
-    google_search,
-    get_base_domain,
+    find_company_site,
+    cse_session,
     URL,
-    validate_email,
-    get_company_email,
-    get_possible_emails,
+    find_valid_email,
     generate_email_variants,
+    is_catch_all,
+    pick_best_candidate,
+    learn_email_pattern,
+    known_pattern_email,
 )
 
 sys.stdout = io.TextIOWrapper(
@@ -67,18 +74,165 @@ def process_email_generation(
     Returns:
         Optional[str]: Validated email or None if no valid email is found.
     """
+    known_email = known_pattern_email(name, domain)
+    if known_email:
+        return known_email
+
     emails = generate_email_variants(name, domain)
-    ai_emails = get_possible_emails(name, domain)
-    for email in ai_emails:
-        if email not in emails:
-            emails.append(email)
+    if is_catch_all(domain):
+        return pick_best_candidate(emails)
+
+    email, result = find_valid_email(name, domain)
+    if email:
+        learn_email_pattern(name, email)
+    return email
+
+
+def fetch_result_page(query: str, start: int, scopes: tuple) -> Optional[dict]:
+    """
+    Fetch one page of Custom Search results over the pooled session.
+
+    Args:
+        query (str): The search query.
+        start (int): The index of the first result on the page.
+        scopes (tuple): The quota scopes the query is charged to.
+
+    Returns:
+        Optional[dict]: The decoded results, or None if the quota is spent or
+        the request failed.
+    """
+    if not cse_quota.acquire(*scopes):
+        print("Custom Search quota is spent. Stopping.")
+        return None
+
+    url = f"{URL}?q={query}&key={GOOGLE_API_KEY}&cx={CSE_ID}&start={start}"
+    print(f"Query: {query}, Page: {start // CSE_PAGE_SIZE + 1}")
+
+    response = cse_session.get(url, timeout=CSE_TIMEOUT)
+    if response.status_code == 429:
+        print("Custom Search quota is spent. Stopping.")
+        cse_quota.exhaust()
+        return None
+    if response.status_code == 400:
+        print(f"Reached limit at start = {start}")
+        return None
+    if response.status_code != 200:
+        print(f"Error: {response.status_code}")
+        return None
+    return response.json()
+
+
+def has_next_page(results: dict) -> bool:
+    """
+    Check whether a results page is followed by another one.
+
+    Args:
+        results (dict): The decoded results page.
+
+    Returns:
+        bool: False if the page is short or has no nextPage entry.
+    """
+    return (
+        len(results.get("items", [])) >= CSE_PAGE_SIZE
+        and "nextPage" in results.get("queries", {})
+    )
+
+
+def produce_result_pages(
+    query: str,
+    scopes: tuple,
+    num_pages: int,
+    pages: queue.Queue,
+    stop: threading.Event,
+) -> None:
+    """
+    Fetch result pages and put them on a bounded queue, ending with None.
+
+    Each page is requested only after the previous one came back full and
+    with a nextPage entry, so no query is charged to the quota for a page
+    that does not exist; the inflated totalResults estimate is not trusted.
+    Fetching still overlaps with the consumer processing the queued pages.
+    Paging stops at the first short page, on a failed request, or when the
+    consumer sets the stop event.
+
+    Args:
+        query (str): The search query.
+        scopes (tuple): The quota scopes the queries are charged to.
+        num_pages (int): The maximum number of pages to fetch.
+        pages (queue.Queue): The queue the pages are put on.
+        stop (threading.Event): Set by the consumer when it stops reading.
+    """
+    def put(item: Optional[dict]) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for page in range(num_pages):
+            if stop.is_set():
+                return
+            results = fetch_result_page(query, page * CSE_PAGE_SIZE + 1, scopes)
+            if results is None or not put(results) or not has_next_page(results):
+                return
+    finally:
+        put(None)
+
+
+def process_search_item(item: dict, location_type: str) -> None:
+    """
+    Turn a LinkedIn search hit into a prospect if it is new and has an email.
+
+    Args:
+        item (dict): The search result item.
+        location_type (str): The location the search was made for.
+    """
+    title = item.get("title", "")
+    link = item.get("link", "")
+    if "linkedin.com/in/" not in link:
+        return
+
+    name_parts = title.split(" – ")
+    if len(name_parts) == 1:
+        name_parts = title.split(" - ")
+    name = name_parts[0].strip() if len(name_parts[0]) > 0 else "Unknown"
+    position = name_parts[1].strip() if len(name_parts) > 1 else "Unknown"
+    firm = name_parts[-1].strip() if name_parts[-1] else "Unknown"
+
+    position, firm = clean_position_and_firm(position, firm)
+    if firm == position:
+        print("Company and position are identical. Skipping...")
+        return
+
+    for client in clients:
+        if is_known_prospect(name, linkedin=link, client=client):
+            print(f"User {name} already exists in Espo database.")
+            return
 
-    for possible_email in emails:
-        name_part = possible_email.split("@")[0]
-        if len(name_part) > 3 and validate_email(possible_email):
-            return possible_email
+    print(f"User {name} not found. Checking further details...")
 
-    return get_company_email(domain)
+    site, domain = find_company_site(firm)
+    email = process_email_generation(name, domain) if domain else None
+
+    if email:
+        print(f"Valid email found: {email}")
+        espo_lead = {
+            "name": name,
+            "position": position,
+            "fromHunter": False,
+            "linkedIn": link,
+            "emailAddress": email,
+            "emailDb": email,
+            "country": location_type,
+            "company": firm,
+            "url": site,
+        }
+        create_prospect(espo_lead)
+    else:
+        print("No valid email found. Skipping user...")
 
 
 def google_linkedin_search(
@@ -89,6 +243,9 @@ def google_linkedin_search(
     """
     Perform a Google search on LinkedIn profiles.
 
+    Result pages are fetched by a background producer while the hits of
+    earlier pages are being processed.
+
     Args:
         position_type (str): Position to search for.
         location_type (str): Location to search in.
@@ -97,71 +254,42 @@ def google_linkedin_search(
     Returns:
         List[dict]: List of processed contacts.
     """
-    for i in range(num_pages):
-        start = i * 10 + 1
-        query = f'{LINKEDIN_PREFIX} "{position_type}" "{location_type}"'
-        url = f"{URL}?q={query}&key={GOOGLE_API_KEY}&cx={CSE_ID}&start={start}"
-        print(f"Query: {query}, Page: {i + 1}")
-
-        response = requests.get(url)
-        if response.status_code == 400:
-            print(f"Reached limit at start = {start}")
-            break
-        if response.status_code != 200:
-            print(f"Error: {response.status_code}")
-            break
-
-        results = response.json()
-        for item in results.get("items", []):
-            title = item.get("title", "")
-            link = item.get("link", "")
-            if "linkedin.com/in/" not in link:
-                continue
-
-            name_parts = title.split(" – ")
-            if len(name_parts) == 1:
-                name_parts = title.split(" - ")
-            name = name_parts[0].strip() if len(name_parts[0]) > 0 else "Unknown"
-            position = name_parts[1].strip() if len(name_parts) > 1 else "Unknown"
-            firm = name_parts[-1].strip() if name_parts[-1] else "Unknown"
-
-            position, firm = clean_position_and_firm(position, firm)
-            if firm == position:
-                print("Company and position are identical. Skipping...")
-                continue
+    query = f'{LINKEDIN_PREFIX} "{position_type}" "{location_type}"'
+    scopes = (f"position:{position_type}", f"location:{location_type}")
+    pages = queue.Queue(maxsize=CSE_PAGE_QUEUE_SIZE)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=produce_result_pages,
+        args=(query, scopes, num_pages, pages, stop),
+        daemon=True,
+    )
+    producer.start()
 
-            for client in clients:
-                if get_lead(name, client):
-                    print(f"User {name} already exists in Espo database.")
-                    break
-            else:
-                print(f"User {name} not found. Checking further details...")
-
-                site = google_search(firm)
-                domain = get_base_domain(site) if site else None
-                email = process_email_generation(name, domain) if domain else None
-
-                if email:
-                    print(f"Valid email found: {email}")
-                    espo_lead = {
-                        "name": name,
-                        "position": position,
-                        "fromHunter": False,
-                        "linkedIn": link,
-                        "emailAddress": email,
-                        "emailDb": email,
-                        "country": location_type,
-                        "company": firm,
-                        "url": site,
-                    }
-                    create_prospect(espo_lead)
-                else:
-                    print("No valid email found. Skipping user...")
+    try:
+        while True:
+            results = pages.get()
+            if results is None:
+                break
+            for item in results.get("items", []):
+                process_search_item(item, location_type)
+    finally:
+        stop.set()
+        producer.join()
 
     return CONTACTS
 
 
-if __name__ == "__main__":
+def search_all_positions() -> None:
+    """
+    Search every position in every location until the quota is spent.
+    """
     for position_type in POSITIONS:
         for location_type in LOCATIONS:
+            if not cse_quota.remaining():
+                print("Custom Search quota is spent. Stopping.")
+                return
             google_linkedin_search(position_type, location_type)
+
+
+if __name__ == "__main__":
+    search_all_positions()
@@ -173,6 +173,70 @@ URL = "https://www.googleapis.com/customsearch/v1"
 ESPO_URL = "https://www.crm.alis-is.com"
 ALEDO_URL = "https://www.aledo-de.alis-is.com"
 PAD_URL = f"https://www.sklonovani-jmen.cz/api?klic={PAD_NAME_API_KEY}&"
+MASS_UPDATE_CHUNK_SIZE = 200
+PROSPECT_INDEX_REFRESH = 300
+PROSPECT_INDEX_FULL_SYNC = 7 * 24 * 3600
+IMPORT_WORKERS = 4
+IMPORT_CHECKPOINT_DB = "data/import_checkpoint.sqlite3"
+VERIFY_JOURNAL_DB = "data/verify_journal.sqlite3"
+VERIFY_JOURNAL_MAX_ATTEMPTS = 3
+VERIFY_JOURNAL_FAILED_TTL = 7 * 24 * 3600
+
+SMTP_TIMEOUT = 10
+SMTP_IDLE_TIMEOUT = 30
+SMTP_MAX_PROBES_PER_SESSION = 50
+
+MX_NEGATIVE_TTL = 3600
+MX_MAX_TTL = 86400
+
+VERIFY_MAX_WORKERS = 16
+VERIFY_MAX_PER_HOST = 2
+VERIFY_HOST_POLL = 0.05
+VERIFY_PROSPECT_WORKERS = int(getenv("VERIFY_PROSPECT_WORKERS", "8"))
+VERIFY_GROUPED = getenv("VERIFY_GROUPED", "").lower() in ("1", "true", "yes")
+VERIFY_PROSPECT_BACKLOG = 1000
+VERIFY_DOMAIN_BATCH_SIZE = 1000
+
+SMTP_RATE_LIMIT = (1.0, 3)
+SMTP_PROVIDER_RATE_LIMITS = {
+    "google.com": (2.0, 5),
+    "googlemail.com": (2.0, 5),
+    "outlook.com": (0.5, 2),
+    "pphosted.com": (0.2, 1),
+    "mimecast.com": (0.2, 1),
+}
+SMTP_THROTTLE_PENALTY = 30
+
+CACHE_DB = "data/cache.sqlite3"
+VERIFY_POSITIVE_TTL = 30 * 24 * 3600
+VERIFY_NEGATIVE_TTL = 7 * 24 * 3600
+VERIFY_DELETE_TTL = 3 * 24 * 3600
+
+PATTERN_MIN_OBSERVATIONS = 50
+PATTERN_COVERAGE = 0.95
+PATTERN_TLD_WEIGHT = 10
+
+DOMAIN_PATTERN_MIN_CONFIRMATIONS = 3
+DOMAIN_PATTERN_MIN_CONFIDENCE = 0.9
+CATCH_ALL_TTL = 30 * 24 * 3600
+ROLE_EMAIL_TTL = 30 * 24 * 3600
+ROLE_EMAIL_NEGATIVE_TTL = 7 * 24 * 3600
+
+LLM_MODEL = "gpt-4"
+LLM_BATCH_SIZE = 20
+
+COMPANY_SITE_TTL = 90 * 24 * 3600
+COMPANY_SITE_NEGATIVE_TTL = 14 * 24 * 3600
+
+CSE_DAILY_LIMIT = 100
+CSE_PAGE_SIZE = 10
+CSE_POOL_SIZE = 4
+CSE_PAGE_QUEUE_SIZE = 2
+CSE_TIMEOUT = 15
+CSE_QUERY_BUDGETS = {
+    # "position:EHS": 20,
+    # "location:Berlin": 30,
+}
 
 PADY = {
     "nominative": 1,  # називний, nominativ
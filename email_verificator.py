@@ -1,20 +1,34 @@
 import logging
 import os
-import time
+import signal
+import threading
+from collections import deque
 
-from typing import Optional, Any
+from typing import Optional, Any, Iterator
 from espo_request import (
-    get_all_entities,
+    iter_entities,
     alis_client,
     aledo_client,
-    update_entity,
+    update_entity_fields,
     delete_entity,
 )
+from data.data import (
+    VERIFY_PROSPECT_WORKERS,
+    VERIFY_PROSPECT_BACKLOG,
+    VERIFY_DOMAIN_BATCH_SIZE,
+    VERIFY_GROUPED,
+)
+from mx_cache import mx_cache
+from smtp_pool import smtp_pool
+from storage import domain_facts, verification_journal as journal
 from searching_service import (
     generate_email_variants,
-    get_possible_emails,
+    find_valid_email,
     get_company_email,
-    validate_email,
+    is_catch_all,
+    pick_best_candidate,
+    learn_email_pattern,
+    known_pattern_email,
 )
 
 
@@ -47,9 +61,12 @@ def update_prospect_data(
         email (str): The email to assign to the prospect.
         client (Any): The client used for API interaction.
     """
-    update_entity("Prospect", prospect_id, email, "emailAddress", client)
-    update_entity("Prospect", prospect_id, email, "emailDb", client)
-    update_entity("Prospect", prospect_id, True, "isChecked", client)
+    update_entity_fields(
+        "Prospect",
+        prospect_id,
+        {"emailAddress": email, "emailDb": email, "isChecked": True},
+        client,
+    )
 
 
 def get_prospect(name: str, email: str, client: Any = alis_client) -> str:
@@ -78,79 +95,495 @@ def get_prospect(name: str, email: str, client: Any = alis_client) -> str:
     return response["list"][0]["id"]
 
 
-def main() -> None:
+def delete_prospect(name: str, email: str, alis_prospect_id: str) -> None:
+    """
+    Deletes a prospect from both CRM instances.
+
+    Args:
+        name (str): The name of the prospect.
+        email (str): The original email of the prospect.
+        alis_prospect_id (str): The ID of the prospect in the alis CRM.
+    """
+    delete_entity("Prospect", alis_prospect_id, alis_client)
+    aledo_prospect_id = get_prospect(name, email, aledo_client)
+    delete_entity("Prospect", aledo_prospect_id, aledo_client)
+    logging.info(f"Prospect {name} Deleted.")
+
+
+def iter_journaled_prospects() -> Iterator[dict]:
+    """
+    Yields the prospects of the current run from the work journal.
+
+    Prospects journaled by an interrupted run come first, in the state they
+    reached. Then unchecked prospects are fetched after the journal's
+    watermark, so nothing before it is fetched again, and each one is
+    journaled as pending before it is yielded. Prospects the journal gave
+    up on are skipped and logged until their failure expires. Once the
+    fetch is exhausted the watermark is reset, so the next run starts from
+    the first unchecked prospect again.
+
+    Yields:
+        dict: Journal entries with the CRM fields and the state of the prospect.
+    """
+    unfinished = journal.unfinished()
+    if unfinished:
+        logging.info(f"Resuming {len(unfinished)} unfinished prospects.")
+    yield from unfinished
+    resumed = {prospect["id"] for prospect in unfinished}
+
+    prospects = iter_entities(
+        "Prospect",
+        select="name,emailDb,emailAddress,isChecked",
+        where=[{"type": "isFalse", "attribute": "isChecked"}],
+        keyset=True,
+        after=journal.watermark(),
+    )
+    skipped = []
+    for prospect in prospects:
+        entry = journal.add(prospect)
+        if entry["state"] == journal.FAILED:
+            skipped.append(entry["id"])
+        if entry["id"] in resumed or entry["state"] == journal.FAILED:
+            continue
+        yield entry
+    if skipped:
+        logging.warning(f"Skipped {len(skipped)} prospects given up on earlier: {', '.join(skipped)}")
+    journal.finish_fetch()
+
+
+def record_failure(prospect: dict, error: Exception) -> None:
+    """
+    Logs a failed prospect and counts the attempt in the work journal.
+
+    Args:
+        prospect (dict): The journal entry of the prospect.
+        error (Exception): The error the prospect failed with.
+    """
+    logging.error(f"Prospect {prospect['name']} failed at {prospect['state']}: {error}")
+    if journal.fail(prospect["id"]):
+        logging.error(
+            f"Giving up on prospect {prospect['name']} ({prospect['id']}) "
+            f"after {journal.max_attempts} attempts."
+        )
+
+
+class DomainContext:
+    """
+    Facts about a mail domain, resolved once and shared by its prospects in a batch.
+
+    A domain with a trusted pattern needs no probing, so its reachability
+    and catch-all verdict are left unknown (None) and resolved by
+    ensure_reachable only if a member cannot use the pattern.
+    """
+
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.mx_hosts = mx_cache.resolve(domain)
+        self.pattern = domain_facts.trusted_pattern(domain)
+        self.reachable: Optional[bool] = None
+        self.catch_all: Optional[bool] = None
+        if self.mx_hosts and not self.pattern:
+            self._resolve_server()
+        self._role_email = None
+        self._role_resolved = False
+
+    def ensure_reachable(self) -> None:
+        """
+        Resolves the mail server facts on first use and raises ConnectionError
+        if the server is unreachable, so the member is retried, not deleted.
+        """
+        if self.reachable is None and self.mx_hosts:
+            self._resolve_server()
+        if self.reachable is False:
+            raise ConnectionError(f"mail server of {self.domain} is unreachable")
+
+    def role_email(self) -> Optional[str]:
+        """
+        Returns a valid role address of the domain, probed on first use only.
+        """
+        if not self._role_resolved:
+            self._role_email = get_company_email(self.domain)
+            self._role_resolved = True
+        return self._role_email
+
+    def refresh_pattern(self) -> None:
+        """
+        Re-reads the trusted pattern after a member's address confirmed one.
+        """
+        self.pattern = domain_facts.trusted_pattern(self.domain)
+
+    def _resolve_server(self) -> None:
+        self.reachable = self._check_reachable()
+        self.catch_all = self.reachable and is_catch_all(self.domain)
+
+    def _check_reachable(self) -> bool:
+        host = self.mx_hosts[0]
+        try:
+            smtp_pool.limiter.acquire(host)
+            with smtp_pool.session(host):
+                return True
+        except Exception as e:
+            logging.info(f"Mail server of {self.domain} is unreachable: {e}")
+            return False
+
+
+def choose_candidates(
+    name: str,
+    domain: str,
+    context: Optional[DomainContext] = None,
+    on_record: tuple = (),
+) -> tuple[str, list]:
+    """
+    Decides how the address of a prospect is found.
+
+    On a catch-all domain the best generated variant is used. If the name
+    yields none (e.g. a single-word name), the address on record at the
+    domain is kept; without one the candidates are probed as usual.
+
+    Args:
+        name (str): The name of the prospect.
+        domain (str): The domain of the prospect's email.
+        context (Optional[DomainContext]): The shared facts of the domain,
+            looked up per prospect if not given.
+        on_record (tuple, optional): The addresses the CRM already holds.
+
+    Returns:
+        tuple[str, list]: "known pattern" or "catch-all" with the address to
+        use, or "probe" with no address if the candidates must be probed.
+    """
+    if context is not None:
+        known_email = context.pattern and known_pattern_email(name, domain, context.pattern)
+        if not known_email:
+            context.ensure_reachable()
+        catch_all = context.catch_all
+    else:
+        known_email = known_pattern_email(name, domain)
+        catch_all = None
+    if known_email:
+        logging.info(f"Known domain pattern, using {known_email}")
+        return "known pattern", [known_email]
+    if catch_all is None:
+        catch_all = is_catch_all(domain)
+    if catch_all:
+        emails = generate_email_variants(name, domain)
+        email = pick_best_candidate(emails)
+        if not email:
+            email = next(
+                (address.lower() for address in on_record
+                 if address and address.lower().endswith(f"@{domain.lower()}")),
+                None,
+            )
+        if email:
+            logging.info(f"Catch-all domain, using {email}")
+            return "catch-all", [email]
+        logging.info(f"Catch-all domain, but no candidate for {name}, probing.")
+    return "probe", []
+
+
+def process_prospect(prospect: dict, context: Optional[DomainContext] = None) -> None:
+    """
+    Finds the address of one prospect and updates or deletes it in both CRMs.
+
+    Every step is written to the work journal, and a prospect resumed from
+    the journal continues after the last step it finished. Resumed probes
+    are answered from the verification and LLM caches.
+
+    Args:
+        prospect (dict): The journal entry of the prospect.
+        context (Optional[DomainContext]): The shared facts of the prospect's
+            domain in grouped mode.
+    """
+    alis_name = prospect["name"]
+    alis_email = prospect["emailDb"]
+    alis_prospect_id = prospect["id"]
+    state = prospect["state"]
+    email: Optional[str] = prospect["email"]
+    result: Any = prospect["result"]
+
+    if not alis_email:
+        journal.advance(alis_prospect_id, journal.DONE)
+        return
+
+    domain = alis_email.split("@")[-1]
+
+    if state == journal.PENDING:
+        mx_hosts = context.mx_hosts if context is not None else mx_cache.resolve(domain)
+        if not mx_hosts and not mx_cache.is_dead(domain):
+            raise ConnectionError(f"MX lookup for {domain} failed")
+        if not mx_hosts:
+            logging.info(f"Domain {domain} has no MX records.")
+            email, result = None, "delete"
+            journal.advance(alis_prospect_id, journal.VERIFIED, email=email, result=result)
+            state = journal.VERIFIED
+        else:
+            prospect["candidates"] = choose_candidates(
+                alis_name, domain, context, (prospect["emailAddress"], alis_email)
+            )
+            journal.advance(alis_prospect_id, journal.CANDIDATES, candidates=prospect["candidates"])
+            state = journal.CANDIDATES
+
+    if state == journal.CANDIDATES:
+        strategy, candidates = prospect["candidates"]
+        if strategy == "probe" or not candidates:
+            if context is not None:
+                context.ensure_reachable()
+            email, result = find_valid_email(
+                alis_name,
+                domain,
+                extra=[prospect["emailAddress"]],
+                include_role=context is None,
+            )
+            logging.info(f"Validation result => {result}")
+            if email:
+                learn_email_pattern(alis_name, email)
+                if context is not None:
+                    context.refresh_pattern()
+            elif context is not None and result != "delete":
+                email = context.role_email()
+                result = bool(email)
+        else:
+            email = candidates[0] if candidates else None
+        journal.advance(alis_prospect_id, journal.VERIFIED, email=email, result=result)
+        state = journal.VERIFIED
+
+    logging.info(f"Email: {email}")
+
+    if email:
+        logging.info(f"\nOLD EMAIL => {alis_email}")
+        logging.info(f"NEW EMAIL => {email}")
+
+        aledo_prospect_id = get_prospect(
+            alis_name, alis_email, aledo_client
+        )
+        update_prospect_data(alis_prospect_id, email, alis_client)
+        update_prospect_data(aledo_prospect_id, email, aledo_client)
+
+    elif result == "delete" or not email:
+        delete_prospect(alis_name, alis_email, alis_prospect_id)
+
+    journal.advance(alis_prospect_id, journal.DONE)
+
+
+def prospect_domain(prospect: dict) -> str:
+    """
+    Returns the lowercase domain of a prospect's email, or "" if it has none.
+    """
+    return (prospect["emailDb"] or "").split("@")[-1].lower()
+
+
+def iter_domain_groups(
+    prospects: Iterator[dict], batch_size: int = VERIFY_DOMAIN_BATCH_SIZE
+) -> Iterator[list]:
+    """
+    Groups prospects by the domain of their email, batch by batch.
+
+    Args:
+        prospects (Iterator[dict]): The prospects in fetch order.
+        batch_size (int, optional): Prospects collected before the groups are yielded.
+
+    Yields:
+        list: The prospects of one domain within a batch, largest groups first.
+    """
+    groups: dict[str, list] = {}
+    count = 0
+    for prospect in prospects:
+        groups.setdefault(prospect_domain(prospect), []).append(prospect)
+        count += 1
+        if count >= batch_size:
+            yield from sorted(groups.values(), key=len, reverse=True)
+            groups, count = {}, 0
+    yield from sorted(groups.values(), key=len, reverse=True)
+
+
+class DomainQueue:
+    """Shared work queue that hands each domain's prospects to one worker at a time."""
+
+    def __init__(self, limit: int = VERIFY_PROSPECT_BACKLOG):
+        self.limit = limit
+        self._groups: dict[str, deque] = {}
+        self._ready: deque = deque()
+        self._busy: set = set()
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def put(self, group: list, stopping: threading.Event) -> bool:
+        """
+        Queues the prospects of one domain, waiting while the backlog is full.
+
+        A busy domain does not hold up the others: its prospects wait in
+        the backlog while idle workers take other domains.
+
+        Args:
+            group (list): Prospects sharing one domain.
+            stopping (threading.Event): Set when the run is being stopped.
+
+        Returns:
+            bool: False if the run was stopped before the group was queued.
+        """
+        domain = prospect_domain(group[0])
+        with self._condition:
+            while self._size >= self.limit and not stopping.is_set():
+                self._condition.wait(timeout=1)
+            if stopping.is_set():
+                return False
+            groups = self._groups.setdefault(domain, deque())
+            if not groups and domain not in self._busy:
+                self._ready.append(domain)
+            groups.append(group)
+            self._size += len(group)
+            self._condition.notify_all()
+            return True
+
+    def get(self, stopping: threading.Event) -> Optional[tuple[str, list]]:
+        """
+        Takes the next group of a domain no other worker is processing.
+
+        Args:
+            stopping (threading.Event): Set when the run is being stopped.
+
+        Returns:
+            Optional[tuple[str, list]]: The domain and its prospects, or None
+            once the queue is closed and drained or the run is stopped.
+        """
+        with self._condition:
+            while not self._ready:
+                if stopping.is_set() or (self._closed and not self._size):
+                    return None
+                self._condition.wait(timeout=1)
+            if stopping.is_set():
+                return None
+            domain = self._ready.popleft()
+            self._busy.add(domain)
+            group = self._groups[domain].popleft()
+            self._size -= len(group)
+            self._condition.notify_all()
+            return domain, group
+
+    def done(self, domain: str) -> None:
+        """
+        Releases a domain after its group was processed.
+
+        Args:
+            domain (str): The domain returned by get.
+        """
+        with self._condition:
+            self._busy.discard(domain)
+            if self._groups[domain]:
+                self._ready.append(domain)
+            else:
+                del self._groups[domain]
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """
+        Tells the workers that no more groups will be queued.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+def main(workers: int = VERIFY_PROSPECT_WORKERS, grouped: bool = VERIFY_GROUPED) -> None:
     """
     Main function to process prospects and update their email information
     or delete them if necessary.
+
+    Prospects are processed by a pool of workers sharing a DomainQueue.
+    Only one worker at a time handles a domain, so a domain's prospects are
+    still processed one after another and per-host politeness holds, while
+    a slow domain does not hold up the others. SIGINT or SIGTERM stops
+    fetching; the workers finish the prospects in hand and the rest resume
+    next run. Signals are only handled when main runs on the main thread.
+
+    In grouped mode the fetched prospects are grouped by domain, and the
+    domain's MX hosts, reachability, catch-all verdict, trusted pattern and
+    role address are resolved once for the whole group. Groups whose mail
+    server is unreachable are left for the next run instead of being deleted.
+
+    Progress is kept in a work journal: a run that stopped halfway resumes
+    with its unfinished prospects and continues fetching where it stopped.
+    A prospect that fails is retried on later runs, up to
+    VERIFY_JOURNAL_MAX_ATTEMPTS times.
+
+    Args:
+        workers (int, optional): The number of prospects processed at once,
+            VERIFY_PROSPECT_WORKERS in the environment when run as a script.
+        grouped (bool, optional): Process prospects in groups by domain,
+            enabled by VERIFY_GROUPED=1 when run as a script.
     """
     setup_logging()
-    
-    prospects = get_all_entities("Prospect")
-    for prospect in prospects:
-        alis_name = prospect["name"]
-        alis_email = prospect["emailDb"]
-        alis_email_address = prospect["emailAddress"]
-        alis_prospect_id = prospect["id"]
-        is_checked = prospect["isChecked"]
-
-        if alis_email and not is_checked:
-            domain = alis_email.split("@")[-1]
-            email: Optional[str] = None
-            result: Optional[str] = None
-            emails = generate_email_variants(alis_name, domain)
-            logging.info(f"\n{len(emails)} EMAILS: {emails}")
-            ai_emails = get_possible_emails(alis_name, domain)
-            logging.info(f"\n{len(ai_emails)} AI_EMAILS: {ai_emails}")
-
-            for pre_email in ai_emails:
-                if pre_email not in emails:
-                    emails.append(pre_email)
-
-            if alis_email_address not in emails:
-                emails.append(alis_email_address)
-
-            logging.info(f"\n{len(emails)} RESULT EMAILS: {emails}")
-
-            for possible_email in emails:
-                name_part = possible_email.split("@")[0]
-
-                if len(name_part) > 3:
-                    result = validate_email(possible_email)
-                    logging.info(f"Validation result => {result}")
-
-                if result == "delete":
-                    break
-
-                if result:
-                    email = possible_email
-                    break
-                else:
-                    time.sleep(1)
-
-            logging.info(f"Email: {email}")
-            company_email = get_company_email(domain, email)
-
-            if email or company_email:
-                if company_email:
-                    email = company_email
-
-                logging.info(f"\nOLD EMAIL => {alis_email}")
-                logging.info(f"NEW EMAIL => {email}")
-
-                aledo_prospect_id = get_prospect(
-                    alis_name, alis_email, aledo_client
-                )
-                update_prospect_data(alis_prospect_id, email, alis_client)
-                update_prospect_data(aledo_prospect_id, email, aledo_client)
-
-            elif result == "delete" or not email:
-                delete_entity("Prospect", alis_prospect_id, alis_client)
-                aledo_prospect_id = get_prospect(
-                    alis_name, alis_email, aledo_client
-                )
-                delete_entity("Prospect", aledo_prospect_id, aledo_client)
-                logging.info(f"Prospect {alis_name} Deleted.")
-                continue
+
+    stopping = threading.Event()
+    work_queue = DomainQueue()
+    failed = 0
+    failed_lock = threading.Lock()
+
+    def stop(signum: int, frame: Any) -> None:
+        logging.info(f"Received signal {signum}, draining in-flight prospects.")
+        stopping.set()
+
+    def work() -> None:
+        nonlocal failed
+        while True:
+            item = work_queue.get(stopping)
+            if item is None:
+                return
+            domain, group = item
+            try:
+                try:
+                    context = DomainContext(domain) if grouped else None
+                except Exception as e:
+                    with failed_lock:
+                        failed += len(group)
+                    logging.error(f"Domain {domain} could not be resolved: {e}")
+                    for prospect in group:
+                        record_failure(prospect, e)
+                    continue
+
+                for prospect in group:
+                    if stopping.is_set():
+                        return
+                    try:
+                        if context is not None and context.reachable is False \
+                                and prospect["state"] != journal.VERIFIED:
+                            raise ConnectionError(f"mail server of {context.domain} is unreachable")
+                        process_prospect(prospect, context)
+                    except Exception as e:
+                        with failed_lock:
+                            failed += 1
+                        record_failure(prospect, e)
+            finally:
+                work_queue.done(domain)
+
+    # Signal handlers can only be installed from the main thread.
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        prospects = iter_journaled_prospects()
+        if grouped:
+            groups = iter_domain_groups(prospects)
+        else:
+            groups = ([prospect] for prospect in prospects)
+        for group in groups:
+            if not work_queue.put(group, stopping):
+                break
+    finally:
+        work_queue.close()
+        for thread in threads:
+            thread.join()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    if stopping.is_set():
+        logging.info("Stopped; unfinished prospects stay in the journal for the next run.")
+    elif failed:
+        logging.info(f"{failed} prospects failed and are retried on the next run.")
 
 
 if __name__ == "__main__":
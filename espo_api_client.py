@@ -1,5 +1,13 @@
+import asyncio
+import json
+import random
+import time
+import urllib.parse
+
+import aiohttp
 import requests
-import urllib
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
 
 
 class EspoAPIError(Exception):
@@ -36,14 +44,40 @@ def http_build_query(data):
     return urllib.parse.urlencode(r_urlencode(data))
 
 
+def backoff_delay(attempt, backoff, max_backoff, retry_after=None):
+    """Exponential backoff with full jitter, or the server's Retry-After."""
+    if retry_after is not None and str(retry_after).isdigit():
+        return min(int(retry_after), max_backoff)
+    return random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+
+
+def is_connect_failure(error):
+    """Whether a requests error was raised before the request reached the server."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
 class EspoAPI:
 
     url_path = '/api/v1/'
+    retry_statuses = (429, 500, 502, 503, 504)
+    idempotent_methods = ('GET', 'PUT', 'DELETE', 'PATCH')
 
-    def __init__(self, url, api_key):
+    def __init__(self, url, api_key, timeout=(5, 30), max_retries=4, backoff=0.5, max_backoff=30, pool_size=10):
         self.url = url
         self.api_key = api_key
         self.status_code = None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def request(self, method, action, params=None):
         if params is None:
@@ -63,7 +97,7 @@ class EspoAPI:
         else:
             kwargs['url'] = kwargs['url'] + '?' + http_build_query(params)
 
-        response = requests.request(method, **kwargs)
+        response = self.send(method, **kwargs)
 
         self.status_code = response.status_code
 
@@ -77,6 +111,37 @@ class EspoAPI:
 
         return response.json()
 
+    def send(self, method, **kwargs):
+        """
+        Send a request over the pooled session, retrying transient failures.
+
+        Connect errors and 429 replies are retried for every method, as a
+        refused connection or a failed DNS lookup never reaches the server.
+        Read errors and 5xx replies are only retried for idempotent methods,
+        so a POST is never sent twice. Retries wait with exponential backoff and
+        full jitter, or as long as a Retry-After header asks.
+        """
+        retry_any = method in self.idempotent_methods
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(method, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if last_attempt or not (retry_any or is_connect_failure(error)):
+                    raise
+                self.wait(attempt)
+                continue
+
+            retryable = response.status_code == 429 or (
+                retry_any and response.status_code in self.retry_statuses
+            )
+            if not retryable or last_attempt:
+                return response
+            self.wait(attempt, response.headers.get('Retry-After'))
+
+    def wait(self, attempt, retry_after=None):
+        time.sleep(backoff_delay(attempt, self.backoff, self.max_backoff, retry_after))
+
     def normalize_url(self, action):
         return self.url + self.url_path + action
 
@@ -86,3 +151,138 @@ class EspoAPI:
             return 'Unknown Error'
 
         return headers['X-Status-Reason']
+
+
+class AsyncEspoAPI:
+    """An asyncio counterpart of EspoAPI with the same surface and errors."""
+
+    url_path = EspoAPI.url_path
+    retry_statuses = EspoAPI.retry_statuses
+    idempotent_methods = EspoAPI.idempotent_methods
+    parse_reason = staticmethod(EspoAPI.parse_reason)
+
+    def __init__(self, url, api_key, timeout=(5, 30), max_retries=4, backoff=0.5, max_backoff=30, pool_size=10):
+        self.url = url
+        self.api_key = api_key
+        self.status_code = None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.session = None
+        self.loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def request(self, method, action, params=None):
+        if params is None:
+            params = {}
+
+        headers = {}
+
+        headers['X-Api-Key'] = self.api_key
+
+        kwargs = {
+            'url': self.normalize_url(action),
+            'headers': headers,
+        }
+
+        if method in ['POST', 'PATCH', 'PUT']:
+            kwargs['json'] = params
+        else:
+            kwargs['url'] = kwargs['url'] + '?' + http_build_query(params)
+
+        status_code, headers, data = await self.send(method, **kwargs)
+
+        self.status_code = status_code
+
+        if self.status_code != 200:
+            reason = self.parse_reason(headers)
+            raise EspoAPIError(f'Wrong request, status code is {status_code}, reason is {reason}')
+
+        if not data:
+            raise EspoAPIError('Wrong request, content response is empty')
+
+        return json.loads(data)
+
+    async def send(self, method, **kwargs):
+        """
+        Send a request over the pooled aiohttp session with the retry policy of EspoAPI.send.
+
+        Returns the status code, headers and body of the final response.
+        """
+        retry_any = method in self.idempotent_methods
+        session = await self.get_session()
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                async with session.request(method, **kwargs) as response:
+                    status_code, headers = response.status, response.headers
+                    data = await response.read()
+            except (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError):
+                if last_attempt:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, self.backoff, self.max_backoff))
+                continue
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if last_attempt or not retry_any:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, self.backoff, self.max_backoff))
+                continue
+
+            retryable = status_code == 429 or (
+                retry_any and status_code in self.retry_statuses
+            )
+            if not retryable or last_attempt:
+                return status_code, headers, data
+            await asyncio.sleep(
+                backoff_delay(attempt, self.backoff, self.max_backoff, headers.get('Retry-After'))
+            )
+
+    async def get_session(self):
+        """
+        Return the aiohttp session, opening it in the running event loop.
+
+        A session is bound to the loop it was opened in, so when the client
+        is used from another loop the old session is closed first: in its own
+        loop if that loop still runs in another thread, or here once it has
+        been closed, which releases its connector without touching the loop.
+        Sockets of a closed loop can no longer be shut down, so call close()
+        before the loop ends.
+        """
+        loop = asyncio.get_running_loop()
+        if self.session is not None and self.loop is not loop:
+            await self.close_stale_session()
+        if self.session is None or self.session.closed:
+            self.loop = loop
+            connect_timeout, read_timeout = self.timeout
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(connect=connect_timeout, sock_read=read_timeout),
+            )
+        return self.session
+
+    async def close_stale_session(self):
+        session, loop = self.session, self.loop
+        self.session = None
+        if session.closed:
+            return
+        if loop.is_running():
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+        elif loop.is_closed():
+            await session.close()
+        else:
+            raise EspoAPIError('The client session belongs to a stopped event loop, close it there first')
+
+    def normalize_url(self, action):
+        return self.url + self.url_path + action
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
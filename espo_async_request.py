@@ -0,0 +1,200 @@
+import asyncio
+from typing import Any
+
+from data.data import ESPO_API_KEY, ESPO_URL, ALEDO_URL, MASS_UPDATE_CHUNK_SIZE
+from espo_api_client import AsyncEspoAPI
+
+alis_client = AsyncEspoAPI(ESPO_URL, ESPO_API_KEY)
+aledo_client = AsyncEspoAPI(ALEDO_URL, ESPO_API_KEY)
+clients = [alis_client, aledo_client]
+
+
+async def close_clients() -> None:
+    """
+    Closes the HTTP sessions of all async clients.
+    """
+    await asyncio.gather(*(client.close() for client in clients))
+
+
+async def get_all_entities(entity: str, client: AsyncEspoAPI = alis_client, limit: int = 200) -> list:
+    """
+    Retrieves all entities of a specified type from the client.
+
+    Args:
+        entity (str): The type of entity to retrieve.
+        client (AsyncEspoAPI, optional): The client to use for the request.
+        limit (int, optional): The number of entities to fetch per request. Defaults to 200.
+
+    Returns:
+        list: A list of all entities.
+    """
+    all_entities = []
+    offset = 0
+
+    while True:
+        params = {
+            "limit": limit,
+            "offset": offset
+        }
+        response = await client.request('GET', entity, params)
+        all_entities.extend(response.get('list', []))
+
+        if offset == 0:
+            print(f"Total persons: {response.get('total', 'unknown')}")
+
+        if len(response.get('list', [])) < limit:
+            break
+        offset += limit
+
+    return all_entities
+
+
+async def delete_entity(entity: str, entity_id: str, client: AsyncEspoAPI) -> None:
+    """
+    Deletes a specified entity by its ID.
+
+    Args:
+        entity (str): The type of entity to delete.
+        entity_id (str): The ID of the entity to delete.
+        client (AsyncEspoAPI): The client to use for the request.
+    """
+    try:
+        await client.request('DELETE', f'{entity}/{entity_id}')
+    except Exception as e:
+        print(f"Error: {e}, skipping deleting.")
+
+
+async def update_entity(entity_type: str, entity_id: str, value: Any, field: str = 'padName', client: AsyncEspoAPI = alis_client) -> None:
+    """
+    Updates a specified field for an entity.
+
+    Args:
+        entity_type (str): The type of entity to update.
+        entity_id (str): The ID of the entity to update.
+        value (str): The new value for the field.
+        field (str, optional): The field to update. Defaults to 'padName'.
+        client (AsyncEspoAPI, optional): The client to use for the request.
+    """
+    await update_entity_fields(entity_type, entity_id, {field: value}, client)
+
+
+async def update_entity_fields(entity_type: str, entity_id: str, fields: dict, client: AsyncEspoAPI = alis_client) -> None:
+    """
+    Updates several fields of an entity with a single request.
+
+    Args:
+        entity_type (str): The type of entity to update.
+        entity_id (str): The ID of the entity to update.
+        fields (dict): The new values keyed by field name.
+        client (AsyncEspoAPI, optional): The client to use for the request.
+    """
+    try:
+        await client.request('PUT', f'{entity_type}/{entity_id}', fields)
+    except Exception as e:
+        print(f"Error: {e}, skipping updating.")
+
+
+async def mass_update(entity_type: str, entity_ids: list, fields: dict, client: AsyncEspoAPI = alis_client, chunk_size: int = MASS_UPDATE_CHUNK_SIZE) -> None:
+    """
+    Applies the same field values to many entities through Espo's mass update action.
+
+    Args:
+        entity_type (str): The type of entity to update.
+        entity_ids (list): The IDs of the entities to update.
+        fields (dict): The new values keyed by field name.
+        client (AsyncEspoAPI, optional): The client to use for the request.
+        chunk_size (int, optional): The number of IDs sent per request.
+    """
+    for start in range(0, len(entity_ids), chunk_size):
+        params = {
+            "entityType": entity_type,
+            "action": "update",
+            "params": {"ids": entity_ids[start:start + chunk_size]},
+            "data": fields,
+        }
+        try:
+            await client.request('POST', 'MassAction', params)
+        except Exception as e:
+            print(f"Error: {e}, skipping mass update.")
+
+
+async def create_prospect(params: dict) -> None:
+    """
+    Creates a new prospect in both CRM instances based on the provided parameters.
+
+    Args:
+        params (dict): A dictionary of parameters for the prospect.
+    """
+    prospect = await get_prospect(params["name"], params["emailAddress"])
+    if not prospect:
+        try:
+            for client in clients:
+                await client.request('POST', 'Prospect', params)
+                print(f"\n ~ LEAD CREATED ~ \n")
+        except Exception as e:
+            print(f"Error: {e}, skipping lead.")
+    else:
+        print("Lead already exists.")
+
+
+async def get_prospect(name: str, email: str, client: AsyncEspoAPI = alis_client) -> bool:
+    """
+    Checks if a prospect already exists in the database.
+
+    Args:
+        name (str): The name of the prospect.
+        email (str): The email address of the prospect.
+        client (AsyncEspoAPI, optional): The client to use for the request.
+
+    Returns:
+        bool: True if the prospect exists, False otherwise.
+    """
+    params = {
+        "select": "name, emailAddress",
+        "where": [
+            {
+                "type": "equals",
+                "attribute": "name",
+                "value": name,
+            },
+            {
+                "type": "equals",
+                "attribute": "emailAddress",
+                "value": email,
+            },
+        ],
+    }
+    response = await client.request('GET', 'Prospect', params)
+    return int(response["total"]) > 0
+
+
+async def get_lead(name: str, client: AsyncEspoAPI = alis_client) -> bool:
+    """
+    Checks if a lead exists in the database.
+
+    Args:
+        name (str): The name of the lead.
+        client (AsyncEspoAPI, optional): The client to use for the request.
+
+    Returns:
+        bool: True if the lead exists, False otherwise (errors count as existing).
+    """
+    params = {
+        "select": "name",
+        "where": [
+            {
+                "type": "equals",
+                "attribute": "name",
+                "value": name,
+            },
+        ],
+    }
+
+    try:
+        response = await client.request('GET', 'Prospect', params)
+        return int(response["total"]) > 0
+
+    except Exception as error:
+        print(f"An unexpected error occurred: {error}")
+
+    return True
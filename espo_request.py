@@ -1,19 +1,38 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Iterator
+
+import json
+import threading
 import time
-from typing import Any
 
 import requests
-import json
 from openai import OpenAI
 
-from requests.exceptions import ConnectTimeout, HTTPError, RequestException
-from data.data import ESPO_API_KEY, ESPO_URL, PAD_URL, OPENAI_API_KEY, ALEDO_URL
+from requests.exceptions import RequestException
+from data.data import (
+    ESPO_API_KEY,
+    ESPO_URL,
+    PAD_URL,
+    OPENAI_API_KEY,
+    ALEDO_URL,
+    MASS_UPDATE_CHUNK_SIZE,
+    PROSPECT_INDEX_REFRESH,
+    PROSPECT_INDEX_FULL_SYNC,
+    IMPORT_WORKERS,
+)
 from espo_api_client import EspoAPI
+from storage import prospect_index, import_checkpoint, normalize_person_name
 from bs4 import BeautifulSoup
 
 alis_client = EspoAPI(ESPO_URL, ESPO_API_KEY)
 aledo_client = EspoAPI(ALEDO_URL, ESPO_API_KEY)
 clients = [alis_client, aledo_client]
 
+_index_refreshed_at: dict[str, float] = {}
+_index_lock = threading.Lock()
+
 
 def get_pad_name(full_name: str, pad: int = 5) -> str:
     """
@@ -130,25 +149,148 @@ def get_all_entities(entity: str, client: EspoAPI = alis_client, limit: int = 20
     Returns:
         list: A list of all entities.
     """
-    all_entities = []
-    offset = 0
+    return list(iter_entities(entity, client, limit))
+
+
+def iter_entities(
+    entity: str,
+    client: EspoAPI = alis_client,
+    limit: int = 200,
+    select: str | None = None,
+    where: list | None = None,
+    keyset: bool = False,
+    order_by: str = "id",
+    parallel: int = 1,
+    after: str | None = None,
+) -> Iterator[dict]:
+    """
+    Yields the entities of a specified type page by page.
 
+    With keyset pagination the pages are ordered by order_by and each request
+    continues after the last value seen, which stays fast on large tables and
+    does not skip records when earlier ones stop matching the filter. Values
+    of order_by other than "id" may repeat; when a whole page shares one
+    value, the records with that value are paged by id, so the cursor is
+    effectively (order_by, id). Offset pagination can fetch up to parallel
+    pages at once once the total is known.
+
+    Args:
+        entity (str): The type of entity to retrieve.
+        client (EspoAPI, optional): The client to use for the request.
+        limit (int, optional): The number of entities to fetch per request. Defaults to 200.
+        select (str | None, optional): Comma-separated attributes to fetch.
+        where (list | None, optional): Espo where conditions.
+        keyset (bool, optional): Use keyset instead of offset pagination.
+        order_by (str, optional): The attribute keyset pagination orders by.
+        parallel (int, optional): Pages fetched concurrently with offsets.
+        after (str | None, optional): With keyset pagination, the order_by
+            value to continue after, e.g. the last ID of an interrupted run.
+
+    Yields:
+        dict: The entities.
+    """
+    params = {"limit": limit}
+    if select:
+        attributes = [attribute.strip() for attribute in select.split(",")]
+        for required in (["id", order_by] if keyset else ["id"]):
+            if required not in attributes:
+                attributes.append(required)
+        params["select"] = ",".join(attributes)
+    if where:
+        params["where"] = list(where)
+
+    if keyset:
+        yield from _iter_entities_keyset(entity, client, params, order_by, after)
+    else:
+        yield from _iter_entities_offset(entity, client, params, parallel)
+
+
+def _iter_entities_offset(entity: str, client: EspoAPI, params: dict, parallel: int) -> Iterator[dict]:
+    limit = params["limit"]
+    response = client.request('GET', entity, {**params, "offset": 0})
+    page = response.get('list', [])
+    print(f"Total persons: {response.get('total', 'unknown')}")
+    yield from page
+    if len(page) < limit:
+        return
+
+    total = response.get('total')
+    if parallel > 1 and isinstance(total, int) and total >= 0:
+        offsets = iter(range(limit, total, limit))
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            window = deque(
+                executor.submit(client.request, 'GET', entity, {**params, "offset": offset})
+                for offset in islice(offsets, parallel)
+            )
+            while window:
+                page = window.popleft().result().get('list', [])
+                offset = next(offsets, None)
+                if offset is not None:
+                    window.append(executor.submit(client.request, 'GET', entity, {**params, "offset": offset}))
+                yield from page
+        return
+
+    offset = limit
     while True:
-        params = {
-            "limit": limit,
-            "offset": offset
-        }
-        response = client.request('GET', entity, params)
-        all_entities.extend(response.get('list', []))
+        response = client.request('GET', entity, {**params, "offset": offset})
+        page = response.get('list', [])
+        yield from page
+        if len(page) < limit:
+            break
+        offset += limit
 
-        if offset == 0:
+
+def _iter_entities_keyset(
+    entity: str,
+    client: EspoAPI,
+    params: dict,
+    order_by: str,
+    after: str | None = None,
+    report_total: bool = True,
+) -> Iterator[dict]:
+    limit = params["limit"]
+    where = params.get("where", [])
+    last_value = after
+    strict = order_by == "id"
+    boundary_ids = set()
+
+    while True:
+        conditions = list(where)
+        if last_value is not None:
+            operator = "greaterThan" if strict else "greaterThanOrEquals"
+            conditions.append({"type": operator, "attribute": order_by, "value": last_value})
+        request_params = {**params, "orderBy": order_by, "order": "asc"}
+        if conditions:
+            request_params["where"] = conditions
+
+        response = client.request('GET', entity, request_params)
+        page = response.get('list', [])
+        if report_total:
             print(f"Total persons: {response.get('total', 'unknown')}")
+            report_total = False
 
-        if len(response.get('list', [])) < limit:
+        yield from (
+            record for record in page
+            if not (record[order_by] == last_value and record["id"] in boundary_ids)
+        )
+        if len(page) < limit:
             break
-        offset += limit
 
-    return all_entities
+        value = page[-1][order_by]
+        if value != last_value:
+            boundary_ids = set()
+        boundary_ids.update(record["id"] for record in page if record[order_by] == value)
+        last_value = value
+        strict = order_by == "id"
+
+        if not strict and page[0][order_by] == value:
+            # A whole page shares one value: page through it by id, then continue after it.
+            tied = {**params, "where": where + [{"type": "equals", "attribute": order_by, "value": value}]}
+            for record in _iter_entities_keyset(entity, client, tied, "id", report_total=False):
+                if record["id"] not in boundary_ids:
+                    yield record
+            boundary_ids = set()
+            strict = True
 
 
 def set_pad_name(entity: str = "Contact") -> None:
@@ -158,7 +300,7 @@ def set_pad_name(entity: str = "Contact") -> None:
     Args:
         entity (str, optional): The type of entity to update. Defaults to "Contact".
     """
-    persons = get_all_entities(entity)
+    persons = iter_entities(entity, select="name", keyset=True)
     count = 0
     for person in persons:
         person_id = person["id"]
@@ -217,6 +359,8 @@ def delete_entity(entity: str, entity_id: str, client: EspoAPI) -> None:
     """
     try:
         client.request('DELETE', f'{entity}/{entity_id}')
+        if entity == "Prospect":
+            prospect_index.remove(client.url, entity_id)
     except Exception as e:
         print(f"Error: {e}, skipping deleting.")
 
@@ -232,12 +376,49 @@ def update_entity(entity_type: str, entity_id: str, value: Any, field: str = 'pa
         field (str, optional): The field to update. Defaults to 'padName'.
         client (EspoAPI, optional): The client to use for the request.
     """
+    update_entity_fields(entity_type, entity_id, {field: value}, client)
+
+
+def update_entity_fields(entity_type: str, entity_id: str, fields: dict, client: EspoAPI = alis_client) -> None:
+    """
+    Updates several fields of an entity with a single request.
+
+    Args:
+        entity_type (str): The type of entity to update.
+        entity_id (str): The ID of the entity to update.
+        fields (dict): The new values keyed by field name.
+        client (EspoAPI, optional): The client to use for the request.
+    """
     try:
-        client.request('PUT', f'{entity_type}/{entity_id}', {field: value})
+        client.request('PUT', f'{entity_type}/{entity_id}', fields)
     except Exception as e:
         print(f"Error: {e}, skipping updating.")
 
 
+def mass_update(entity_type: str, entity_ids: list, fields: dict, client: EspoAPI = alis_client, chunk_size: int = MASS_UPDATE_CHUNK_SIZE) -> None:
+    """
+    Applies the same field values to many entities through Espo's mass update action.
+
+    Args:
+        entity_type (str): The type of entity to update.
+        entity_ids (list): The IDs of the entities to update.
+        fields (dict): The new values keyed by field name.
+        client (EspoAPI, optional): The client to use for the request.
+        chunk_size (int, optional): The number of IDs sent per request.
+    """
+    for start in range(0, len(entity_ids), chunk_size):
+        params = {
+            "entityType": entity_type,
+            "action": "update",
+            "params": {"ids": entity_ids[start:start + chunk_size]},
+            "data": fields,
+        }
+        try:
+            client.request('POST', 'MassAction', params)
+        except Exception as e:
+            print(f"Error: {e}, skipping mass update.")
+
+
 def create_prospect(params: dict) -> None:
     """
     Creates a new prospect based on the provided parameters.
@@ -245,11 +426,12 @@ def create_prospect(params: dict) -> None:
     Args:
         params (dict): A dictionary of parameters for the prospect.
     """
-    prospect = get_prospect(params["name"], params["emailAddress"])
+    prospect = is_known_prospect(params["name"], params["emailAddress"], params.get("linkedIn"))
     if not prospect:
         try:
             for client in clients:
-                client.request('POST', 'Prospect', params)
+                created = client.request('POST', 'Prospect', params)
+                prospect_index.upsert(client.url, [created])
                 print(f"\n ~ LEAD CREATED ~ \n")
         except Exception as e:
             print(f"Error: {e}, skipping lead.")
@@ -310,30 +492,103 @@ def get_lead(name: str, client: EspoAPI = alis_client) -> bool:
         ],
     }
 
-    retries = 5
-    for attempt in range(retries):
-        try:
-            response = client.request('GET', 'Prospect', params)
-            return int(response["total"]) > 0
+    try:
+        response = client.request('GET', 'Prospect', params)
+        return int(response["total"]) > 0
 
-        except ConnectTimeout:
-            print(f"Attempt {attempt + 1} of {retries}: Connection timed out. Retrying...")
-            if attempt < retries - 1:
-                time.sleep(5)
+    except RequestException as req_err:
+        print(f"Request error occurred: {req_err}")
 
-        except HTTPError as http_err:
-            print(f"HTTP error occurred: {http_err}")
-            break
+    except Exception as error:
+        print(f"An unexpected error occurred: {error}")
 
-        except RequestException as req_err:
-            print(f"Request error occurred: {req_err}")
-            break
+    return True
 
-        except Exception as error:
-            print(f"An unexpected error occurred: {error}")
-            break
 
-    return True
+def sync_prospect_index(client: EspoAPI = alis_client, full: bool = False) -> None:
+    """
+    Brings the local prospect index of a CRM instance up to date.
+
+    The first sync, and one every PROSPECT_INDEX_FULL_SYNC seconds, reloads
+    the instance completely, which also drops prospects deleted by others.
+    In between, only prospects modified since the last sync are fetched.
+
+    Args:
+        client (EspoAPI, optional): The client of the instance to sync.
+        full (bool, optional): Force a full reload.
+    """
+    state = prospect_index.sync_state(client.url)
+    full = full or state is None or time.time() - state[1] > PROSPECT_INDEX_FULL_SYNC
+    modified_at = None if full else state[0]
+    full_sync_at = time.time() if full else state[1]
+
+    where = []
+    if modified_at:
+        where.append({"type": "greaterThanOrEquals", "attribute": "modifiedAt", "value": modified_at})
+    records = iter_entities(
+        "Prospect",
+        client,
+        select="name,emailAddress,linkedIn,modifiedAt",
+        where=where,
+        keyset=True,
+        order_by="id" if full else "modifiedAt",
+    )
+
+    seen_ids = set()
+    batch = []
+    for record in records:
+        seen_ids.add(record["id"])
+        batch.append(record)
+        if record.get("modifiedAt") and (modified_at is None or record["modifiedAt"] > modified_at):
+            modified_at = record["modifiedAt"]
+        if len(batch) >= 1000:
+            prospect_index.upsert(client.url, batch)
+            batch = []
+    prospect_index.upsert(client.url, batch)
+    if full:
+        prospect_index.prune(client.url, seen_ids)
+    prospect_index.set_sync_state(client.url, modified_at, full_sync_at)
+    _index_refreshed_at[client.url] = time.time()
+
+
+def is_known_prospect(
+    name: str | None = None,
+    email: str | None = None,
+    linkedin: str | None = None,
+    client: EspoAPI = alis_client,
+) -> bool:
+    """
+    Checks in the local index whether a prospect already exists in the instance.
+
+    The index is refreshed incrementally when it is older than
+    PROSPECT_INDEX_REFRESH seconds. If the refresh fails, the stale index
+    is used; if the index was never loaded, the prospect is assumed to exist
+    so no duplicate is created, and the next call retries the load.
+
+    Args:
+        name (str | None, optional): The prospect name.
+        email (str | None, optional): The email address; matched together with the name.
+        linkedin (str | None, optional): The LinkedIn URL; a match on it alone counts.
+        client (EspoAPI, optional): The client of the instance to check.
+
+    Returns:
+        bool: True if the prospect exists, False otherwise.
+    """
+    if time.time() - _index_refreshed_at.get(client.url, 0) > PROSPECT_INDEX_REFRESH:
+        with _index_lock:
+            if time.time() - _index_refreshed_at.get(client.url, 0) > PROSPECT_INDEX_REFRESH:
+                try:
+                    sync_prospect_index(client)
+                except Exception as e:
+                    if prospect_index.sync_state(client.url) is None:
+                        print(f"Error: {e}, prospect index was never loaded, assuming the prospect exists.")
+                        return True
+                    print(f"Error: {e}, using the local prospect index as is.")
+                    _index_refreshed_at[client.url] = time.time()
+
+    if linkedin and prospect_index.find(client.url, linkedin=linkedin):
+        return True
+    return bool(name and prospect_index.find(client.url, name=name, email=email))
 
 
 def get_prospects_quantity() -> int:
@@ -372,70 +627,222 @@ def read_json_file(file: str) -> dict:
         return data
 
 
-def get_email_address_for_prospect() -> dict:
+def iter_json_records(file: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
     """
-    Retrieves email addresses for prospects from multiple sources.
+    Reads records one by one from a JSON array or a JSON Lines file.
 
-    Returns:
-        dict: A dict of updated prospects with email addresses.
+    Files ending in `.jsonl` are read line by line. Any other file must hold a
+    top-level JSON array, which is decoded in chunks so only the record being
+    parsed is kept in memory.
+
+    Args:
+        file (str): The path to the JSON or JSON Lines file.
+        chunk_size (int, optional): Characters read from the file at a time.
+
+    Yields:
+        dict: The records of the file in order.
+    """
+    with open(file, 'r', encoding='utf-8') as f:
+        if file.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer, position, started = "", 0, False
+        while True:
+            chunk = f.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position == len(buffer):
+                    break
+                if not started:
+                    if buffer[position] != "[":
+                        raise ValueError(f"{file} does not contain a JSON array")
+                    started = True
+                    position += 1
+                    continue
+                if buffer[position] == "]":
+                    return
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break
+                # A number or literal cut by the chunk boundary decodes as a shorter
+                # value, so only accept a value once its separator has been read.
+                following = end
+                while following < len(buffer) and buffer[following] in " \t\r\n":
+                    following += 1
+                if chunk and (following == len(buffer) or buffer[following] not in ",]"):
+                    break
+                position = end
+                yield record
+            if not chunk:
+                if started:
+                    raise ValueError(f"{file} ends before its JSON array is closed")
+                return
+
+
+def iter_prospects_with_email_address(
+    prospects_file: str = "data/prospects.json",
+    emails_file: str = "emails.json",
+    email_address_file: str = "email_address.json",
+) -> Iterator[dict]:
+    """
+    Joins prospects with their email addresses while streaming the exports.
+
+    The emails export is indexed by `entity_id`, then only the addresses
+    referenced by prospects are kept from the email address export, keyed by
+    `id`. Prospects are streamed last and each one is matched in constant time.
+
+    Args:
+        prospects_file (str, optional): The prospects export.
+        emails_file (str, optional): The emails export linking entities to addresses.
+        email_address_file (str, optional): The email addresses export.
+
+    Yields:
+        dict: Each prospect, with `email_address` set when a match was found.
     """
-    prospects = read_json_file("data/prospects.json")
-    emails = read_json_file("emails.json")
-    email_address = read_json_file("email_address.json")
+    address_id_by_entity = {}
+    for email in iter_json_records(emails_file):
+        if email['entity_type'] == "Prospect":
+            address_id_by_entity.setdefault(email['entity_id'], email['email_address_id'])
 
-    for prospect in prospects:
+    wanted_ids = set(address_id_by_entity.values())
+    address_by_id = {}
+    for email_addr in iter_json_records(email_address_file):
+        if email_addr['id'] in wanted_ids:
+            address_by_id.setdefault(email_addr['id'], email_addr['name'])
+
+    for prospect in iter_json_records(prospects_file):
         prospect_id = prospect['id']
-        related_email = next(
-            (email for email in emails
-             if email['entity_id'] == prospect_id and email['entity_type'] == "Prospect"),
-            None
-        )
+        email_address_id = address_id_by_entity.get(prospect_id)
 
-        if related_email:
-            email_address_id = related_email['email_address_id']
-            related_email_address = next(
-                (email_addr for email_addr in email_address if email_addr['id'] == email_address_id),
-                None
-            )
-            if related_email_address:
-                prospect['email_address'] = related_email_address['name']
+        if email_address_id is not None:
+            email_address = address_by_id.get(email_address_id)
+            if email_address is not None:
+                prospect['email_address'] = email_address
             else:
                 print(f"Не знайдено email_address для email_address_id: {email_address_id}")
         else:
             print(f"Не знайдено пов'язаних email для Prospect ID: {prospect_id}")
 
-    return prospects
+        yield prospect
+
+
+def get_email_address_for_prospect() -> list:
+    """
+    Retrieves email addresses for prospects from multiple sources.
+
+    Returns:
+        list: The updated prospects with email addresses.
+    """
+    return list(iter_prospects_with_email_address())
+
+
+def import_prospect(client: EspoAPI, source_id: str, espo_prospect: dict) -> dict | None:
+    """
+    Creates one prospect in the instance unless it already exists there.
+
+    The outcome is written to the import checkpoint, so a rerun skips the
+    prospect. A failed request is not checkpointed and is retried next run.
+
+    Args:
+        client (EspoAPI): The client of the instance to import into.
+        source_id (str): The prospect ID in the export.
+        espo_prospect (dict): The prospect fields to create.
+
+    Returns:
+        dict | None: The created record, or None if the prospect was skipped or failed.
+    """
+    name = espo_prospect["name"]
+    try:
+        if is_known_prospect(name, client=client):
+            if prospect_index.sync_state(client.url) is None:
+                print(f"Prospect index of {client.url} is not loaded, {name} will be retried on the next run.", flush=True)
+                return None
+            print(f"User {name} already exists in espo database.", flush=True)
+            import_checkpoint.mark(source_id, client.url, None)
+            return None
+        created = client.request('POST', 'Prospect', espo_prospect)
+    except Exception as e:
+        print(f"Error: {e}, prospect {name} will be retried on the next run.", flush=True)
+        return None
+
+    prospect_index.upsert(client.url, [created])
+    import_checkpoint.mark(source_id, client.url, created.get("id"))
+    return created
 
 
-def create_prospect_from_json() -> None:
+def create_prospect_from_json(workers: int = IMPORT_WORKERS) -> None:
     """
     Creates prospects from the data in the JSON file.
+
+    Each CRM instance gets its own pool of `workers` writers, and at most
+    twice that many prospects are in flight per instance. Source IDs already
+    in the import checkpoint are skipped, so an interrupted import resumes
+    where it stopped.
+
+    Args:
+        workers (int, optional): Concurrent writers per CRM instance.
     """
-    updated_prospects = get_email_address_for_prospect()
+    imported = {client.url: import_checkpoint.imported(client.url) for client in clients}
+    claimed = {client.url: set() for client in clients}
+    executors = {client.url: ThreadPoolExecutor(max_workers=workers) for client in clients}
+    windows = {client.url: deque() for client in clients}
     counter = 0
-    for prospect in updated_prospects:
-        name = prospect["name"]
-        email = prospect["email_address"]
-        espo_prospect = {
-            "name": prospect["name"],
-            "position": prospect["position"],
-            "fromHunter": prospect["from_hunter"],
-            "linkedIn": prospect["linked_in"],
-            "emailAddress": prospect["email_address"],
-            "emailDb": prospect["email_address"],
-            "country": prospect["country"],
-            "company": prospect["company"],
-            "url": prospect["url"]
-        }
+
+    def collect(client: EspoAPI) -> None:
+        nonlocal counter
+        name, email, future = windows[client.url].popleft()
+        if future.result() is not None and client == alis_client:
+            counter += 1
+            print(f"{counter}\nProspect: {name}\nEmail: {email}\n")
+
+    try:
+        for prospect in iter_prospects_with_email_address():
+            source_id = prospect["id"]
+            name = prospect["name"]
+            email = prospect["email_address"]
+            espo_prospect = {
+                "name": prospect["name"],
+                "position": prospect["position"],
+                "fromHunter": prospect["from_hunter"],
+                "linkedIn": prospect["linked_in"],
+                "emailAddress": prospect["email_address"],
+                "emailDb": prospect["email_address"],
+                "country": prospect["country"],
+                "company": prospect["company"],
+                "url": prospect["url"]
+            }
+            for client in clients:
+                if source_id in imported[client.url]:
+                    continue
+                # Two source rows with one name would race past the existence check.
+                key = normalize_person_name(name)
+                if key and key in claimed[client.url]:
+                    print(f"User {name} already exists in espo database.", flush=True)
+                    import_checkpoint.mark(source_id, client.url, None)
+                    continue
+                claimed[client.url].add(key)
+
+                window = windows[client.url]
+                if len(window) >= 2 * workers:
+                    collect(client)
+                window.append((name, email, executors[client.url].submit(import_prospect, client, source_id, espo_prospect)))
+
         for client in clients:
-            if get_lead(prospect["name"], client):
-                print(f"User {name} already exists in espo database.", flush=True)
-                continue
-            else:
-                client.request('POST', 'Prospect', espo_prospect)
-                if client == alis_client:
-                    counter += 1
-                    print(f"{counter}\nProspect: {name}\nEmail: {email}\n")
+            while windows[client.url]:
+                collect(client)
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True, cancel_futures=True)
 
 
 if __name__ == "__main__":
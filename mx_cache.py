@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+
+from dns import resolver, exception
+
+from data.data import MX_NEGATIVE_TTL, MX_MAX_TTL
+
+log = logging.getLogger(__name__)
+
+
+class MXCache:
+    """In-process cache of MX lookups that honours the record TTL."""
+
+    def __init__(self, negative_ttl: int = MX_NEGATIVE_TTL, max_ttl: int = MX_MAX_TTL):
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+        self._entries: dict[str, tuple[float, list[str] | None]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, domain: str) -> list[str] | None:
+        """
+        Return the MX hosts of a domain ordered by preference.
+
+        NXDOMAIN and NoAnswer results are cached as well, so a dead domain is
+        looked up only once per negative TTL. Other DNS errors (timeouts,
+        unreachable name servers) are reported the same way but not cached;
+        use is_dead to tell them apart.
+
+        Args:
+            domain (str): The domain to resolve.
+
+        Returns:
+            list[str] | None: The MX host names, or None if the domain is invalid.
+        """
+        domain = domain.lower().strip(".")
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(domain)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        try:
+            answer = resolver.resolve(domain, 'MX')
+        except (resolver.NXDOMAIN, resolver.NoAnswer) as e:
+            print(f"Invalid domain: {e}")
+            self._store(domain, None, self.negative_ttl)
+            return None
+        except exception.DNSException as e:
+            print(f"Invalid domain: {e}")
+            return None
+
+        records = sorted(answer, key=lambda record: record.preference)
+        hosts = [str(record.exchange).strip('.') for record in records]
+        hosts = [host for host in hosts if host]
+        if not hosts:
+            print(f"Invalid domain: {domain} does not accept mail (null MX).")
+            self._store(domain, None, min(answer.rrset.ttl, self.max_ttl))
+            return None
+        self._store(domain, hosts, min(answer.rrset.ttl, self.max_ttl))
+        return hosts
+
+    def is_dead(self, domain: str) -> bool:
+        """
+        Tell whether a domain is known not to accept mail.
+
+        Only the definitive answers that resolve caches count: NXDOMAIN,
+        NoAnswer and null MX. A failed lookup does not, so callers can tell
+        a dead domain from a resolver hiccup after resolve returned None.
+
+        Args:
+            domain (str): The domain to check.
+
+        Returns:
+            bool: True if the domain is cached as invalid, False otherwise.
+        """
+        domain = domain.lower().strip(".")
+        with self._lock:
+            entry = self._entries.get(domain)
+        return bool(entry) and entry[0] > time.monotonic() and entry[1] is None
+
+    def clear(self) -> None:
+        """
+        Drop every cached entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, domain: str, hosts: list[str] | None, ttl: int) -> None:
+        with self._lock:
+            self._entries[domain] = (time.monotonic() + ttl, hosts)
+
+
+mx_cache = MXCache()
@@ -0,0 +1,152 @@
+import threading
+import time
+
+from data.data import (
+    SMTP_RATE_LIMIT,
+    SMTP_PROVIDER_RATE_LIMITS,
+)
+
+
+class TokenBucket:
+    """A token bucket refilled at a fixed rate up to its capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token, going into debt if none is available.
+
+        Returns:
+            float: The number of seconds the caller must wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def try_acquire(self) -> float:
+        """
+        Take one token only if it is available right away.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        """
+        Block until a token is available and take it.
+        """
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    def penalize(self, seconds: float) -> None:
+        """
+        Hold back new tokens for a while, e.g. after the server throttled us.
+
+        Args:
+            seconds (float): How long no token may be handed out.
+        """
+        with self._lock:
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class RateLimiter:
+    """Token buckets keyed by MX host, or by provider for shared mail hosting."""
+
+    def __init__(
+        self,
+        default: tuple[float, float] = SMTP_RATE_LIMIT,
+        providers: dict[str, tuple[float, float]] = SMTP_PROVIDER_RATE_LIMITS,
+    ):
+        self.default = default
+        self.providers = providers
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def key(self, host: str) -> str:
+        """
+        Return the bucket key for an MX host.
+
+        Args:
+            host (str): The MX host name.
+
+        Returns:
+            str: The provider domain if the host belongs to a known provider,
+            otherwise the host itself.
+        """
+        host = host.lower().strip(".")
+        for provider in self.providers:
+            if host == provider or host.endswith("." + provider):
+                return provider
+        return host
+
+    def bucket(self, host: str) -> TokenBucket:
+        """
+        Return the bucket that paces probes to an MX host.
+
+        Args:
+            host (str): The MX host name.
+
+        Returns:
+            TokenBucket: The shared bucket for the host or its provider.
+        """
+        key = self.key(host)
+        with self._lock:
+            if key not in self._buckets:
+                rate, capacity = self.providers.get(key, self.default)
+                self._buckets[key] = TokenBucket(rate, capacity)
+            return self._buckets[key]
+
+    def acquire(self, host: str) -> None:
+        """
+        Block until a probe to the MX host is allowed.
+
+        Only the calling thread waits; probes to other hosts are not affected.
+
+        Args:
+            host (str): The MX host name.
+        """
+        self.bucket(host).acquire()
+
+    def try_acquire(self, host: str) -> float:
+        """
+        Allow a probe to the MX host only if it needs no waiting.
+
+        Args:
+            host (str): The MX host name.
+
+        Returns:
+            float: 0 if the probe may run now, otherwise the seconds to wait.
+        """
+        return self.bucket(host).try_acquire()
+
+    def penalize(self, host: str, seconds: float) -> None:
+        """
+        Back off from an MX host that signalled throttling.
+
+        Args:
+            host (str): The MX host name.
+            seconds (float): How long to hold back probes.
+        """
+        self.bucket(host).penalize(seconds)
+
+
+smtp_limiter = RateLimiter()
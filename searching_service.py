@@ -1,24 +1,40 @@
 import ast
 import base64
+import json
 import os
 import random
 import re
-import time
+import string
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from time import sleep
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 import requests
+from requests.adapters import HTTPAdapter
 import smtplib
 import logging
 import socket
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from openai import OpenAI
-from dns import resolver, exception
 from unidecode import unidecode
+from typing import Any, Iterable, Iterator
 from urllib.parse import urlparse
+from mx_cache import mx_cache
+from smtp_pool import smtp_pool, host_slots, probe_executor
+from storage import (
+    verification_store,
+    pattern_stats,
+    domain_facts,
+    llm_cache,
+    company_sites,
+    cse_quota,
+)
 from data.data import (
     email_patterns,
     emails_with_middle,
@@ -33,16 +49,56 @@ from data.data import (
     TOKEN_FILE,
     CREDENTIALS_FILE,
     SCOPES,
-    senders
+    VERIFY_MAX_WORKERS,
+    VERIFY_HOST_POLL,
+    LLM_MODEL,
+    LLM_BATCH_SIZE,
+    CSE_POOL_SIZE,
+    CSE_TIMEOUT,
 )
 
 log = logging.getLogger(__name__)
 
+cse_session = requests.Session()
+cse_session.mount("https://", HTTPAdapter(pool_maxsize=CSE_POOL_SIZE))
+
+_catch_all_verdicts: dict[str, bool] = {}
+_catch_all_lock = threading.Lock()
+_role_emails: dict[str, str | None] = {}
+_role_email_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_openai_client() -> OpenAI:
+    """
+    Return the OpenAI client shared by all LLM calls.
+
+    Returns:
+        OpenAI: The client.
+    """
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+
+def normalize_key(name: str) -> str:
+    """
+    Normalize a person or company name for use as a cache key.
+
+    Args:
+        name (str): The name to normalize.
+
+    Returns:
+        str: The lower-cased, accent-free name with collapsed whitespace.
+    """
+    return " ".join(normalize_name(name).lower().split())
+
 
 def get_possible_emails(name: str, domain: str) -> list:
     """
     Generate possible email addresses for a given name and domain using GPT.
 
+    Answers are cached on disk by normalized name and domain, so a prospect
+    is sent to the LLM only once.
+
     Args:
         name (str): The name of the person.
         domain (str): The domain name.
@@ -50,7 +106,9 @@ def get_possible_emails(name: str, domain: str) -> list:
     Returns:
         list: A list of possible email addresses.
     """
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    cached = llm_cache.get(normalize_key(name), domain)
+    if cached is not None:
+        return cached
 
     prompt = (
         f"Generate all possible email addresses for: name {name}, "
@@ -58,8 +116,8 @@ def get_possible_emails(name: str, domain: str) -> list:
         f"where each email address is in lower_case format."
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4",
+    response = get_openai_client().chat.completions.create(
+        model=LLM_MODEL,
         messages=[{"role": "system", "content": "You are the best assistant for generating"
                                                " a list of all possible email addresses. "
                                                "Return python list without any comments."},
@@ -71,28 +129,109 @@ def get_possible_emails(name: str, domain: str) -> list:
     try:
         email_list = ast.literal_eval(answer)
         if isinstance(email_list, list):
+            email_list = [str(email).lower() for email in email_list]
+            llm_cache.put(normalize_key(name), domain, email_list)
             return email_list
     except Exception as e:
         print(f"Error: {e}")
         print(f"Raw API response: {answer}")
-        return []
+    return []
+
+
+def get_possible_emails_batch(prospects: list) -> dict:
+    """
+    Generate possible email addresses for many prospects with few GPT requests.
+
+    Cached prospects are answered from disk; the rest are sent in chunks of
+    LLM_BATCH_SIZE, each as one request that asks for a JSON object mapping
+    the prospect's index to its list of addresses.
+
+    Args:
+        prospects (list): (name, domain) tuples.
+
+    Returns:
+        dict: The list of possible email addresses per (name, domain) tuple.
+        Prospects whose answer could not be parsed get an empty list.
+    """
+    results = {}
+    missing = []
+    for name, domain in dict.fromkeys(prospects):
+        cached = llm_cache.get(normalize_key(name), domain)
+        if cached is not None:
+            results[(name, domain)] = cached
+        else:
+            missing.append((name, domain))
+
+    for start in range(0, len(missing), LLM_BATCH_SIZE):
+        chunk = missing[start:start + LLM_BATCH_SIZE]
+        listing = "\n".join(
+            f"{index}: name {name}, domain {domain}"
+            for index, (name, domain) in enumerate(chunk)
+        )
+        prompt = (
+            f"Generate all possible email addresses for each of these people:\n"
+            f"{listing}\n"
+            f"Return the answer as a JSON object whose keys are the numbers above "
+            f"and whose values are lists of email addresses in lower_case format."
+        )
+        response = get_openai_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=[{"role": "system", "content": "You are the best assistant for generating"
+                                                   " lists of all possible email addresses. "
+                                                   "Return a JSON object without any comments."},
+                      {"role": "user", "content": prompt}]
+        )
+        answer = response.choices[0].message.content
+        if "{" in answer and "}" in answer:
+            answer = answer[answer.index("{"): answer.rindex("}") + 1]
+        try:
+            email_lists = json.loads(answer)
+        except ValueError as e:
+            print(f"Error: {e}")
+            print(f"Raw API response: {answer}")
+            email_lists = {}
+
+        for index, (name, domain) in enumerate(chunk):
+            email_list = email_lists.get(str(index)) if isinstance(email_lists, dict) else None
+            if isinstance(email_list, list):
+                email_list = [str(email).lower() for email in email_list]
+                llm_cache.put(normalize_key(name), domain, email_list)
+                results[(name, domain)] = email_list
+            else:
+                results[(name, domain)] = []
+
+    return results
 
 
 def google_search(company_name: str) -> str | None:
     """
     Perform a Google search to find the official site of a company.
 
+    Results, including companies without a matching site, are cached by
+    normalized company name, so each company costs at most one query per TTL.
+
     Args:
         company_name (str): The name of the company.
 
     Returns:
         str | None: The URL of the company's official site or None if not found.
     """
+    company = normalize_key(company_name)
+    cached = company_sites.get(company)
+    if cached is not None:
+        return cached[0]
+
+    if not cse_quota.acquire("company"):
+        print("Custom Search quota is spent, skipping company search.")
+        return None
+
     query = f"{company_name} official site"
     url = URL + f"?q={query}&key={GOOGLE_API_KEY}&cx={CSE_ID}"
     latin_name = normalize_name(company_name)
 
-    response = requests.get(url)
+    response = cse_session.get(url, timeout=CSE_TIMEOUT)
+    if response.status_code == 429:
+        cse_quota.exhaust()
     if response.status_code == 200:
         results = response.json()
         items = results.get("items", [])
@@ -103,13 +242,35 @@ def google_search(company_name: str) -> str | None:
                 company_name.lower().split()[0] in link.lower()
                 or latin_name.lower().split()[0] in link.lower()
             ):
+                company_sites.put(company, link, get_base_domain(link))
                 return link
 
+        company_sites.put(company, None, None)
+        return None
+
     else:
         print(f"Error: {response.status_code}")
         return None
 
 
+def find_company_site(company_name: str) -> tuple[str | None, str | None]:
+    """
+    Find the official site of a company and its base domain.
+
+    Args:
+        company_name (str): The name of the company.
+
+    Returns:
+        tuple[str | None, str | None]: The site URL and its base domain.
+    """
+    cached = company_sites.get(normalize_key(company_name))
+    if cached is not None:
+        return cached
+
+    site = google_search(company_name)
+    return site, get_base_domain(site) if site else None
+
+
 def get_base_domain(url: str) -> str | None:
     """
     Extract the base domain from a URL.
@@ -135,6 +296,7 @@ def get_base_domain(url: str) -> str | None:
     return None
 
 
+@lru_cache(maxsize=4096)
 def normalize_name(name: str) -> str:
     """
     Normalize a name by removing special characters and accent marks.
@@ -149,16 +311,37 @@ def normalize_name(name: str) -> str:
     return unidecode(name)
 
 
-def generate_email_variants(full_name: str, domain: str) -> list:
+def compile_patterns(patterns: list) -> dict:
     """
-    Generate possible email variants for a given full name and domain.
+    Parse email patterns once into the name parts each of them needs.
+
+    Args:
+        patterns (list): The email patterns.
+
+    Returns:
+        dict: The deduplicated patterns mapped to their required fields.
+    """
+    formatter = string.Formatter()
+    return {
+        pattern: frozenset(field for _, field, _, _ in formatter.parse(pattern) if field)
+        for pattern in patterns
+    }
+
+
+PATTERNS = compile_patterns(email_patterns)
+PATTERNS_WITH_MIDDLE = compile_patterns(email_patterns + emails_with_middle)
+
+
+@lru_cache(maxsize=4096)
+def split_name(full_name: str) -> dict:
+    """
+    Split a full name into the parts used by the email patterns.
 
     Args:
         full_name (str): The full name of the person.
-        domain (str): The domain name.
 
     Returns:
-        list: A list of generated email variants.
+        dict: The lower-cased name parts and initials; missing parts are empty.
     """
     full_name = normalize_name(full_name)
     full_name = re.sub(
@@ -173,25 +356,141 @@ def generate_email_variants(full_name: str, domain: str) -> list:
     first = name_parts[0].lower()
     middle = name_parts[1].lower() if len(name_parts) > 2 else ''
     last = name_parts[-1].lower() if len(name_parts) > 1 else ''
-    first_initial = first[0]
-    middle_initial = middle[0] if middle else ''
-    last_initial = last[0] if last else ''
-    possible_emails = email_patterns
-    if middle:
-        possible_emails.extend(emails_with_middle)
-    email_list = []
+    return {
+        "first": first,
+        "middle": middle,
+        "last": last,
+        "first_initial": first[:1],
+        "middle_initial": middle[:1],
+        "last_initial": last[:1],
+    }
+
+
+def iter_email_candidates(full_name: str, domain: str, ranked: bool = True) -> Iterator[tuple[str, str]]:
+    """
+    Lazily generate possible email variants with the patterns they come from.
+
+    Patterns that need a missing name part (e.g. a middle initial for a
+    two-part name) are skipped, and every address is yielded only once.
+
+    Args:
+        full_name (str): The full name of the person.
+        domain (str): The domain name.
+        ranked (bool, optional): Put the domain's confirmed pattern first and
+            order the rest by their hit rate (see PatternStats).
+            Defaults to True.
+
+    Yields:
+        tuple[str, str]: (pattern, email) tuples, most likely first.
+    """
+    parts = split_name(full_name)
+    compiled = PATTERNS_WITH_MIDDLE if parts["middle"] else PATTERNS
+    available = frozenset(field for field, value in parts.items() if value)
+
+    possible_emails = [pattern for pattern, fields in compiled.items() if fields <= available]
+    if ranked:
+        known_pattern = domain_facts.get(domain).get("pattern")
+        ranked_patterns = pattern_stats.rank(possible_emails, domain)
+        if known_pattern in possible_emails:
+            ranked_patterns = [known_pattern] + [
+                pattern for pattern in ranked_patterns if pattern != known_pattern
+            ]
+        possible_emails = ranked_patterns
+
+    seen = set()
     for pattern in possible_emails:
-        email = pattern.format(
-            first=first,
-            middle=middle,
-            last=last,
-            first_initial=first_initial,
-            middle_initial=middle_initial,
-            last_initial=last_initial
-        )
-        possible_email = f"{email}@{domain}"
-        email_list.append(possible_email)
-    return email_list
+        possible_email = f"{pattern.format(**parts)}@{domain}"
+        if possible_email not in seen:
+            seen.add(possible_email)
+            yield pattern, possible_email
+
+
+def generate_email_candidates(full_name: str, domain: str, ranked: bool = True) -> list:
+    """
+    Generate possible email variants together with the patterns they come from.
+
+    Args:
+        full_name (str): The full name of the person.
+        domain (str): The domain name.
+        ranked (bool, optional): Rank the patterns, see iter_email_candidates.
+
+    Returns:
+        list: A list of (pattern, email) tuples, most likely first.
+    """
+    return list(iter_email_candidates(full_name, domain, ranked))
+
+
+def iter_email_variants(full_name: str, domain: str) -> Iterator[str]:
+    """
+    Lazily generate possible email variants for a given full name and domain.
+
+    Args:
+        full_name (str): The full name of the person.
+        domain (str): The domain name.
+
+    Yields:
+        str: The generated email variants, most likely first.
+    """
+    for pattern, email in iter_email_candidates(full_name, domain):
+        yield email
+
+
+def generate_email_variants(full_name: str, domain: str) -> list:
+    """
+    Generate possible email variants for a given full name and domain.
+
+    Args:
+        full_name (str): The full name of the person.
+        domain (str): The domain name.
+
+    Returns:
+        list: A list of generated email variants, most likely first.
+    """
+    return list(iter_email_variants(full_name, domain))
+
+
+def learn_email_pattern(full_name: str, email: str) -> str | None:
+    """
+    Record the pattern of a verified address in the pattern statistics and
+    as the confirmed pattern of its domain.
+
+    Args:
+        full_name (str): The full name of the person.
+        email (str): The verified email address.
+
+    Returns:
+        str | None: The matching pattern, or None if the address does not
+        follow any known pattern (e.g. it was suggested by the LLM).
+    """
+    domain = email.split("@")[-1]
+    for pattern, candidate in iter_email_candidates(full_name, domain, ranked=False):
+        if candidate == email.lower():
+            pattern_stats.record_hit(pattern, domain)
+            domain_facts.record_pattern(domain, pattern)
+            return pattern
+    return None
+
+
+def known_pattern_email(full_name: str, domain: str, pattern: str | None = None) -> str | None:
+    """
+    Build the address from the domain's trusted pattern, so it need not be probed.
+
+    Args:
+        full_name (str): The full name of the person.
+        domain (str): The domain name.
+        pattern (str | None, optional): The trusted pattern if the caller
+            already looked it up.
+
+    Returns:
+        str | None: The address, or None if the domain has no trusted pattern.
+    """
+    pattern = pattern or domain_facts.trusted_pattern(domain)
+    if not pattern:
+        return None
+    for candidate_pattern, email in iter_email_candidates(full_name, domain, ranked=False):
+        if candidate_pattern == pattern:
+            return pick_best_candidate([email])
+    return None
 
 
 def company_emails(domain: str) -> list:
@@ -211,6 +510,10 @@ def get_company_email(domain: str, employee_email: str = None) -> str | None:
     """
     Retrieve a valid company email from a list of possible emails.
 
+    All role addresses are probed in one SMTP transaction, and the result
+    is remembered per domain in memory and in the domain facts store, so
+    the other prospects of the company do not probe them again.
+
     Args:
         domain (str): The company's domain.
         employee_email (str, optional): The employee's email if known.
@@ -218,14 +521,46 @@ def get_company_email(domain: str, employee_email: str = None) -> str | None:
     Returns:
         str | None: The valid company email, or None if no valid email found.
     """
-    if not employee_email:
-        email_variants = company_emails(domain)
-        for email in email_variants:
-            validation = validate_email(email)
-            if validation and validation != "delete":
-                return email
-            time.sleep(1)
-    return None
+    if employee_email:
+        return None
+
+    domain = domain.lower()
+    with _role_email_lock:
+        if domain in _role_emails:
+            return _role_emails[domain]
+
+    stored = domain_facts.get_role_email(domain)
+    if stored is not None:
+        with _role_email_lock:
+            _role_emails[domain] = stored or None
+        return stored or None
+
+    mx_hosts = mx_cache.resolve(domain)
+    if not mx_hosts:
+        return None
+
+    email_variants = company_emails(domain)
+    try:
+        replies = smtp_pool.probe_many(mx_hosts[0], email_variants)
+    except (socket.error, smtplib.SMTPException) as e:
+        print(f"Role address check failed: {e}")
+        return None
+
+    role_email = None
+    for email in email_variants:
+        code, message = replies[email]
+        if code == 250 or code >= 500:
+            verification_store.put(email, code == 250, code, mx_hosts[0])
+        if code == 250 and role_email is None:
+            role_email = email
+
+    if role_email is None and any(400 <= code < 500 for code, _ in replies.values()):
+        return None
+
+    with _role_email_lock:
+        _role_emails[domain] = role_email
+    domain_facts.set_role_email(domain, role_email)
+    return role_email
 
 
 def authenticate_gmail() -> Credentials:
@@ -381,12 +716,14 @@ def is_delivered(receiver: str) -> bool:
         return False
 
 
-def validate_email(email: str) -> bool | str:
+def validate_email(email: str, paced: bool = True) -> bool | str:
     """
     Validate an email address by checking its format and DNS records.
 
     Args:
         email (str): The email address to validate.
+        paced (bool, optional): Wait for the MX host's rate limiter; False
+            if the caller already took a token.
 
     Returns:
         bool | str: True if the email is valid, False if invalid, or "delete" if the domain is invalid.
@@ -396,41 +733,341 @@ def validate_email(email: str) -> bool | str:
         print("Invalid format.")
         return False
 
+    cached = verification_store.get(email)
+    if cached is not None:
+        print(f"Cached result: {cached}")
+        return cached
+
     local_part, domain = email.split("@")
 
-    try:
-        mx_records = resolver.resolve(domain, 'MX')
-    except exception.DNSException as e:
-        print(f"Invalid domain: {e}")
+    mx_hosts = mx_cache.resolve(domain)
+    if not mx_hosts:
+        if not mx_cache.is_dead(domain):
+            print(f"MX lookup for {domain} failed, not judging {email}.")
+            return False
+        verification_store.put(email, "delete")
         return "delete"
 
     try:
-        mx_record = str(mx_records[0].exchange).strip('.')
+        mx_record = mx_hosts[0]
+        code, message = smtp_pool.probe(mx_record, email, paced)
+
+    except (socket.error, smtplib.SMTPException) as e:
+        print(f"SMTP validation failed: {e}")
+        return False
+
+    if code == 250 or code >= 500:
+        verification_store.put(email, code == 250, code, mx_record)
+
+    if code == 250:
+        return True
+    else:
+        return False
 
-        server = smtplib.SMTP(timeout=10)
-        server.connect(mx_record)
 
-        sender = random.choice(senders)
-        sender_domain = sender.split("@")[-1]
+def validate_emails(
+    candidates: Iterable[tuple],
+    window: int = VERIFY_MAX_WORKERS,
+) -> Iterator[tuple[tuple, bool | str]]:
+    """
+    Validate many email addresses concurrently.
+
+    Candidates are (email, domain) tuples, optionally followed by a key that
+    groups the candidates of one prospect, in order of rank. A group is
+    settled by its highest-ranked accepted candidate (or one whose domain
+    turns out to be invalid), once every candidate ranked above it has been
+    rejected, so the outcome matches a sequential first-accepted-wins loop.
+    The remaining candidates of a settled group are skipped.
+
+    A probe is handed to the shared probe_executor only once its MX host
+    has a free slot in host_slots and a rate limiter token, so the
+    executor's threads never wait on a busy or throttled host and probes to
+    other hosts keep flowing. Only the calling thread waits.
+
+    Args:
+        candidates (Iterable[tuple]): The candidates to validate.
+        window (int, optional): Candidates of this call queued at once.
+
+    Yields:
+        tuple[tuple, bool | str]: The candidate and its validate_email result.
+        Rejections are yielded in order of completion, the winner of a group
+        once the group is settled. Skipped candidates are not yielded.
+    """
+    settled: set = set()
+    submitted: dict = {}
+    finished: dict = {}
+    cursors: dict = {}
+
+    def is_settled(candidate: tuple) -> bool:
+        return len(candidate) > 2 and candidate[2] in settled
+
+    def run(candidate: tuple, slot: threading.BoundedSemaphore) -> bool | str | None:
         try:
-            server.ehlo(str(sender_domain))
-        except Exception as e:
-            print(e)
-            server.helo(str(sender_domain))
+            if is_settled(candidate):
+                return None
+            return validate_email(candidate[0], paced=False)
+        finally:
+            slot.release()
+
+    def admit(candidate: tuple) -> float | Future:
+        cached = verification_store.get(candidate[0])
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        mx_hosts = mx_cache.resolve(candidate[1])
+        host = mx_hosts[0] if mx_hosts else candidate[1]
+        slot = host_slots.slot(host)
+        if not slot.acquire(blocking=False):
+            return VERIFY_HOST_POLL
+        delay = smtp_pool.limiter.try_acquire(host) if mx_hosts else 0.0
+        if delay:
+            slot.release()
+            return delay
+        future = probe_executor.submit(run, candidate, slot)
+        # A probe cancelled before it started must still give its slot back.
+        future.add_done_callback(lambda done: slot.release() if done.cancelled() else None)
+        return future
+
+    def winner(group: Any) -> tuple | None:
+        results = finished[group]
+        cursor = cursors.get(group, 0)
+        while cursor in results:
+            candidate, result = results[cursor]
+            if result is True or result == "delete":
+                return candidate, result
+            cursor += 1
+        cursors[group] = cursor
+        return None
+
+    candidates = iter(candidates)
+    waiting: deque = deque()
+    pending = {}
+    try:
+        while True:
+            while len(pending) + len(waiting) < window * 2:
+                candidate = next(candidates, None)
+                if candidate is None:
+                    break
+                rank = None
+                if len(candidate) > 2:
+                    rank = submitted.get(candidate[2], 0)
+                    submitted[candidate[2]] = rank + 1
+                waiting.append((candidate, rank))
+
+            retry_in = None
+            for _ in range(len(waiting)):
+                candidate, rank = waiting.popleft()
+                if is_settled(candidate):
+                    continue
+                admitted = admit(candidate)
+                if isinstance(admitted, Future):
+                    pending[admitted] = (candidate, rank)
+                else:
+                    waiting.append((candidate, rank))
+                    retry_in = admitted if retry_in is None else min(retry_in, admitted)
+
+            if not pending and not waiting:
+                break
+            if not pending:
+                sleep(retry_in)
+                continue
+
+            done, _ = wait(pending, timeout=retry_in, return_when=FIRST_COMPLETED)
+            for future in done:
+                candidate, rank = pending.pop(future)
+                if future.cancelled() or is_settled(candidate):
+                    continue
+                result = future.result()
+                if result is None:
+                    continue
+                if rank is None:
+                    yield candidate, result
+                    continue
+
+                group = candidate[2]
+                finished.setdefault(group, {})[rank] = (candidate, result)
+                if not (result is True or result == "delete"):
+                    yield candidate, result
+                decided = winner(group)
+                if decided is None:
+                    continue
+                settled.add(group)
+                for other, (other_candidate, _) in pending.items():
+                    if is_settled(other_candidate):
+                        other.cancel()
+                yield decided
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def iter_candidate_tiers(
+    name: str,
+    domain: str,
+    extra: Iterable[str] = (),
+    include_role: bool = True,
+) -> Iterator[tuple[str, list]]:
+    """
+    Lazily produce email candidates in tiers of decreasing likelihood.
 
-        server.mail(str(sender))
-        code, message = server.rcpt(email)
-        server.quit()
+    The tiers are the domain's confirmed pattern, the ranked deterministic
+    variants that cover most of the observed hits, the extra addresses
+    (e.g. the one already on record), the variants of the rarer patterns,
+    the LLM suggestions and finally the role address the company accepts,
+    which get_company_email probes once per domain. A tier is only built
+    when the consumer asks for it, so the LLM is not called while an
+    earlier tier may still succeed. Addresses already yielded by an earlier
+    tier are left out.
 
-        if code == 250:
-            return True
-        else:
-            return False
+    Args:
+        name (str): The name of the person.
+        domain (str): The domain name.
+        extra (Iterable[str], optional): Further known addresses to try.
+        include_role (bool, optional): Whether to end with role addresses.
+
+    Yields:
+        tuple[str, list]: The tier name and its new candidate addresses.
+    """
+    def known_pattern() -> list:
+        pattern = domain_facts.get(domain).get("pattern")
+        return [
+            email for candidate_pattern, email in iter_email_candidates(name, domain, ranked=False)
+            if candidate_pattern == pattern
+        ]
+
+    ranked = []
+
+    def variants(head: bool) -> list:
+        if not ranked:
+            candidates = generate_email_candidates(name, domain)
+            size = pattern_stats.head_size([pattern for pattern, _ in candidates], domain)
+            ranked.extend([candidates[:size], candidates[size:]])
+        return [email for _, email in ranked[0 if head else 1]]
+
+    tiers = [
+        ("known pattern", known_pattern),
+        ("deterministic", lambda: variants(head=True)),
+        ("extra", lambda: [email for email in extra if email]),
+        ("rare pattern", lambda: variants(head=False)),
+        ("llm", lambda: get_possible_emails(name, domain)),
+    ]
+    if include_role:
+        tiers.append(("role", lambda: [email for email in [get_company_email(domain)] if email]))
+
+    seen = set()
+    for tier_name, build in tiers:
+        candidates = []
+        for email in build():
+            email = email.lower()
+            if email not in seen:
+                seen.add(email)
+                candidates.append(email)
+        if candidates:
+            yield tier_name, candidates
+
+
+def find_valid_email(
+    name: str,
+    domain: str,
+    extra: Iterable[str] = (),
+    include_role: bool = True,
+) -> tuple[str | None, bool | str]:
+    """
+    Probe the candidate tiers of a prospect until an address is accepted.
+
+    The candidates of each tier are validated concurrently, and the next
+    tier is only built when the current one is exhausted.
+
+    Args:
+        name (str): The name of the person.
+        domain (str): The domain name.
+        extra (Iterable[str], optional): Further known addresses to try.
+        include_role (bool, optional): Whether to fall back to role addresses.
 
+    Returns:
+        tuple[str | None, bool | str]: The accepted address (or None) and the
+        validation result, "delete" if the domain turned out to be invalid.
+    """
+    for tier_name, tier in iter_candidate_tiers(name, domain, extra, include_role):
+        candidates = [
+            (email, domain, name)
+            for email in tier
+            if len(email.split("@")[0]) > 3
+        ]
+        print(f"Probing {len(candidates)} {tier_name} candidates for {name}")
+        for candidate, result in validate_emails(candidates):
+            if result == "delete":
+                return None, "delete"
+            if result:
+                return candidate[0], True
+    return None, False
+
+
+def is_catch_all(domain: str) -> bool:
+    """
+    Check whether the mail server of a domain accepts any recipient.
+
+    A random, nonexistent local part is probed once per domain and the
+    verdict is cached in memory and in the domain facts store, so accept-all
+    servers are not probed variant by variant.
+
+    Args:
+        domain (str): The domain to check.
+
+    Returns:
+        bool: True if the domain accepts mail for any address, False otherwise.
+    """
+    domain = domain.lower()
+    with _catch_all_lock:
+        if domain in _catch_all_verdicts:
+            return _catch_all_verdicts[domain]
+
+    verdict = domain_facts.get_catch_all(domain)
+    if verdict is not None:
+        with _catch_all_lock:
+            _catch_all_verdicts[domain] = verdict
+        return verdict
+
+    mx_hosts = mx_cache.resolve(domain)
+    if not mx_hosts:
+        return False
+
+    local_part = "".join(random.choices(string.ascii_lowercase + string.digits, k=20))
+    try:
+        code, message = smtp_pool.probe(mx_hosts[0], f"{local_part}@{domain}")
     except (socket.error, smtplib.SMTPException) as e:
-        print(f"SMTP validation failed: {e}")
+        print(f"Catch-all check failed: {e}")
+        return False
+
+    if code >= 400 and code < 500:
         return False
 
+    verdict = code == 250
+    with _catch_all_lock:
+        _catch_all_verdicts[domain] = verdict
+    domain_facts.set_catch_all(domain, verdict)
+    if verdict:
+        print(f"Domain {domain} accepts all addresses.")
+    return verdict
+
+
+def pick_best_candidate(email_list: list) -> str | None:
+    """
+    Pick the best-ranked usable candidate without probing it.
+
+    Args:
+        email_list (list): Candidate addresses ordered by rank.
+
+    Returns:
+        str | None: The first candidate with a valid format and a local part
+        longer than three characters, or None.
+    """
+    for email in email_list:
+        if len(email.split("@")[0]) > 3 and re.match(VALID_ADDRESS_REGEXP, email):
+            return email
+    return None
+
 
 if __name__ == "__main__":
     print(validate_email("matthiashermann@tjiko.de"))
@@ -0,0 +1,325 @@
+import atexit
+import logging
+import random
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator
+
+from data.data import (
+    senders,
+    SMTP_TIMEOUT,
+    SMTP_IDLE_TIMEOUT,
+    SMTP_MAX_PROBES_PER_SESSION,
+    SMTP_THROTTLE_PENALTY,
+    VERIFY_MAX_WORKERS,
+    VERIFY_MAX_PER_HOST,
+)
+from rate_limiter import RateLimiter, smtp_limiter
+
+log = logging.getLogger(__name__)
+
+SERVICE_NOT_AVAILABLE = 421
+
+
+class SMTPSession:
+    """A single SMTP connection to an MX host, reused for many RCPT TO probes."""
+
+    def __init__(self, host: str, timeout: int = SMTP_TIMEOUT):
+        self.host = host
+        self.timeout = timeout
+        self.server = None
+        self.sender = None
+        self.probes = 0
+        self.last_used = 0.0
+        self.in_transaction = False
+
+    def connect(self) -> None:
+        """
+        Open the connection and greet the server with a random sender domain.
+        """
+        self.close()
+        server = smtplib.SMTP(timeout=self.timeout)
+        server.connect(self.host)
+
+        sender = random.choice(senders)
+        sender_domain = sender.split("@")[-1]
+        try:
+            server.ehlo(str(sender_domain))
+        except Exception as e:
+            print(e)
+            server.helo(str(sender_domain))
+
+        self.server = server
+        self.sender = sender
+        self.probes = 0
+        self.in_transaction = False
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Quit the connection, ignoring errors from an already dead socket.
+        """
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                try:
+                    self.server.close()
+                except Exception:
+                    pass
+        self.server = None
+        self.in_transaction = False
+
+    def is_expired(self, idle_timeout: float = SMTP_IDLE_TIMEOUT) -> bool:
+        """
+        Check whether the session is closed, idle for too long or used up.
+
+        Args:
+            idle_timeout (float, optional): Seconds a session may stay idle.
+
+        Returns:
+            bool: True if the session must not be reused.
+        """
+        return (
+            self.server is None
+            or time.monotonic() - self.last_used > idle_timeout
+            or self.probes >= SMTP_MAX_PROBES_PER_SESSION
+        )
+
+    def probe(self, email: str) -> tuple[int, bytes]:
+        """
+        Ask the server whether it accepts the recipient.
+
+        The envelope is reset between probes, so every RCPT TO is sent in its
+        own MAIL FROM transaction over the same connection. A 421 reply or a
+        dropped connection triggers one reconnect and a retry.
+
+        Args:
+            email (str): The recipient address to probe.
+
+        Returns:
+            tuple[int, bytes]: The SMTP reply code and message of RCPT TO.
+        """
+        return self.probe_many([email])[email]
+
+    def probe_many(self, emails: list) -> dict[str, tuple[int, bytes]]:
+        """
+        Ask the server about several recipients in a single transaction.
+
+        One MAIL FROM is followed by a RCPT TO for every address. A 421 reply
+        or a dropped connection triggers one reconnect and a retry of the
+        whole batch.
+
+        Args:
+            emails (list): The recipient addresses to probe.
+
+        Returns:
+            dict[str, tuple[int, bytes]]: The reply code and message of RCPT TO
+            per address.
+
+        Raises:
+            smtplib.SMTPSenderRefused: If the server rejected MAIL FROM or
+                RSET, which says nothing about the recipients.
+        """
+        for attempt in range(2):
+            try:
+                if self.server is None:
+                    self.connect()
+                replies = self._rcpt_many(emails)
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if attempt:
+                    raise
+                continue
+            except smtplib.SMTPSenderRefused as e:
+                self.close()
+                if attempt or e.smtp_code != SERVICE_NOT_AVAILABLE:
+                    raise
+                log.info(f"{self.host} replied 421, reconnecting.")
+                continue
+
+            if not attempt and any(code == SERVICE_NOT_AVAILABLE for code, _ in replies.values()):
+                log.info(f"{self.host} replied 421, reconnecting.")
+                self.close()
+                continue
+            return replies
+
+        return replies
+
+    def _rcpt_many(self, emails: list) -> dict[str, tuple[int, bytes]]:
+        if self.in_transaction:
+            code, message = self.server.rset()
+            if code != 250:
+                raise smtplib.SMTPSenderRefused(code, message, str(self.sender))
+            self.in_transaction = False
+
+        code, message = self.server.mail(str(self.sender))
+        if code != 250:
+            raise smtplib.SMTPSenderRefused(code, message, str(self.sender))
+        self.in_transaction = True
+
+        replies = {}
+        for email in emails:
+            replies[email] = self.server.rcpt(email)
+            self.probes += 1
+        self.last_used = time.monotonic()
+        return replies
+
+
+class SMTPPool:
+    """Keeps idle SMTP sessions per MX host so probes skip connection setup."""
+
+    def __init__(
+        self,
+        idle_timeout: float = SMTP_IDLE_TIMEOUT,
+        timeout: int = SMTP_TIMEOUT,
+        limiter: RateLimiter = smtp_limiter,
+    ):
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.limiter = limiter
+        self._idle: dict[str, list[SMTPSession]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, host: str) -> Iterator[SMTPSession]:
+        """
+        Borrow a session for the MX host and return it to the pool afterwards.
+
+        A session that raised is closed instead of being returned.
+
+        Args:
+            host (str): The MX host name.
+
+        Yields:
+            SMTPSession: A session connected to the host.
+        """
+        session = self._acquire(host)
+        try:
+            yield session
+        except Exception:
+            session.close()
+            raise
+        self._release(session)
+
+    def probe(self, host: str, email: str, paced: bool = True) -> tuple[int, bytes]:
+        """
+        Probe a recipient over a pooled session to the MX host.
+
+        The probe waits for the host's rate limiter first, and a temporary
+        (4xx) reply makes the limiter back off from the host.
+
+        Args:
+            host (str): The MX host name.
+            email (str): The recipient address to probe.
+            paced (bool, optional): Wait for the rate limiter; False if the
+                caller already took a token with try_acquire.
+
+        Returns:
+            tuple[int, bytes]: The SMTP reply code and message of RCPT TO.
+        """
+        return self.probe_many(host, [email], paced)[email]
+
+    def probe_many(self, host: str, emails: list, paced: bool = True) -> dict[str, tuple[int, bytes]]:
+        """
+        Probe several recipients in one transaction over a pooled session.
+
+        The batch takes a single slot of the host's rate limiter, and any
+        temporary (4xx) reply makes the limiter back off from the host.
+
+        Args:
+            host (str): The MX host name.
+            emails (list): The recipient addresses to probe.
+            paced (bool, optional): Wait for the rate limiter; False if the
+                caller already took a token with try_acquire.
+
+        Returns:
+            dict[str, tuple[int, bytes]]: The reply code and message per address.
+
+        Raises:
+            smtplib.SMTPSenderRefused: If the server rejected the sender.
+        """
+        if paced:
+            self.limiter.acquire(host)
+        try:
+            with self.session(host) as session:
+                replies = session.probe_many(emails)
+        except smtplib.SMTPSenderRefused as e:
+            if 400 <= e.smtp_code < 500:
+                self.limiter.penalize(host, SMTP_THROTTLE_PENALTY)
+            raise
+        if any(400 <= code < 500 for code, _ in replies.values()):
+            self.limiter.penalize(host, SMTP_THROTTLE_PENALTY)
+        return replies
+
+    def close_all(self) -> None:
+        """
+        Close every idle session in the pool.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for sessions in idle.values():
+            for session in sessions:
+                session.close()
+
+    def _acquire(self, host: str) -> SMTPSession:
+        expired = []
+        session = None
+        with self._lock:
+            sessions = self._idle.get(host, [])
+            while sessions:
+                candidate = sessions.pop()
+                if candidate.is_expired(self.idle_timeout):
+                    expired.append(candidate)
+                else:
+                    session = candidate
+                    break
+        for candidate in expired:
+            candidate.close()
+
+        if session is None:
+            session = SMTPSession(host, self.timeout)
+            session.connect()
+        return session
+
+    def _release(self, session: SMTPSession) -> None:
+        if session.is_expired(self.idle_timeout):
+            session.close()
+            return
+        with self._lock:
+            self._idle.setdefault(session.host, []).append(session)
+
+
+class HostSlots:
+    """Caps the concurrent probes per MX host across all callers in the process.
+
+    Callers take a slot without blocking and only then hand the probe to
+    probe_executor, so its threads never wait on a busy host.
+    """
+
+    def __init__(self, per_host: int = VERIFY_MAX_PER_HOST):
+        self.per_host = per_host
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def slot(self, host: str) -> threading.BoundedSemaphore:
+        """
+        Return the semaphore that bounds the probes against the host.
+
+        Args:
+            host (str): The MX host name.
+
+        Returns:
+            threading.BoundedSemaphore: The host's semaphore.
+        """
+        with self._lock:
+            return self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+
+
+smtp_pool = SMTPPool()
+atexit.register(smtp_pool.close_all)
+host_slots = HostSlots()
+probe_executor = ThreadPoolExecutor(max_workers=VERIFY_MAX_WORKERS, thread_name_prefix="smtp-probe")
@@ -0,0 +1,1069 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from data.data import (
+    CACHE_DB,
+    IMPORT_CHECKPOINT_DB,
+    VERIFY_JOURNAL_DB,
+    VERIFY_JOURNAL_MAX_ATTEMPTS,
+    VERIFY_JOURNAL_FAILED_TTL,
+    VERIFY_POSITIVE_TTL,
+    VERIFY_NEGATIVE_TTL,
+    VERIFY_DELETE_TTL,
+    PATTERN_MIN_OBSERVATIONS,
+    PATTERN_COVERAGE,
+    PATTERN_TLD_WEIGHT,
+    DOMAIN_PATTERN_MIN_CONFIRMATIONS,
+    DOMAIN_PATTERN_MIN_CONFIDENCE,
+    CATCH_ALL_TTL,
+    ROLE_EMAIL_TTL,
+    ROLE_EMAIL_NEGATIVE_TTL,
+    COMPANY_SITE_TTL,
+    COMPANY_SITE_NEGATIVE_TTL,
+    CSE_DAILY_LIMIT,
+    CSE_QUERY_BUDGETS,
+)
+
+
+class SQLiteStore:
+    """Base class for the local SQLite caches, safe to share between threads."""
+
+    schema = ""
+    # (table, column, type) added since the table was first created.
+    added_columns = ()
+
+    def __init__(self, path: str = CACHE_DB):
+        self.path = path
+        self._connection = None
+        self._lock = threading.RLock()
+
+    def execute(self, sql: str, params: tuple = ()) -> list:
+        """
+        Run a statement and commit it.
+
+        Args:
+            sql (str): The SQL statement.
+            params (tuple, optional): The statement parameters.
+
+        Returns:
+            list: The fetched rows.
+        """
+        with self._lock:
+            connection = self._connect()
+            rows = connection.execute(sql, params).fetchall()
+            connection.commit()
+            return rows
+
+    def executemany(self, sql: str, seq_of_params: list) -> None:
+        """
+        Run a statement for every parameter tuple in one transaction.
+
+        Args:
+            sql (str): The SQL statement.
+            seq_of_params (list): The parameter tuples.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(sql, seq_of_params)
+            connection.commit()
+
+    def close(self) -> None:
+        """
+        Close the underlying connection.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(self.schema)
+            for table, column, column_type in self.added_columns:
+                existing = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+                if column not in existing:
+                    connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+
+class VerificationStore(SQLiteStore):
+    """Outcomes of validate_email keyed by normalized address."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS verifications (
+            address TEXT PRIMARY KEY,
+            verdict TEXT NOT NULL,
+            code INTEGER,
+            mx_host TEXT,
+            checked_at REAL NOT NULL
+        );
+    """
+
+    ttls = {
+        "valid": VERIFY_POSITIVE_TTL,
+        "invalid": VERIFY_NEGATIVE_TTL,
+        "delete": VERIFY_DELETE_TTL,
+    }
+
+    def get(self, email: str) -> bool | str | None:
+        """
+        Return a fresh stored result for the address.
+
+        Args:
+            email (str): The email address.
+
+        Returns:
+            bool | str | None: The stored validate_email result, or None if
+            the address is unknown or its result is stale.
+        """
+        rows = self.execute(
+            "SELECT verdict, checked_at FROM verifications WHERE address = ?",
+            (normalize_address(email),),
+        )
+        if not rows:
+            return None
+        verdict, checked_at = rows[0]
+        if time.time() - checked_at > self.ttls[verdict]:
+            return None
+        if verdict == "delete":
+            return "delete"
+        return verdict == "valid"
+
+    def put(self, email: str, result: bool | str, code: int | None = None, mx_host: str | None = None) -> None:
+        """
+        Record the result of a verification.
+
+        Args:
+            email (str): The email address.
+            result (bool | str): The validate_email result.
+            code (int | None, optional): The SMTP reply code to RCPT TO.
+            mx_host (str | None, optional): The MX host that was probed.
+        """
+        if result == "delete":
+            verdict = "delete"
+        else:
+            verdict = "valid" if result else "invalid"
+        self.execute(
+            "INSERT OR REPLACE INTO verifications VALUES (?, ?, ?, ?, ?)",
+            (normalize_address(email), verdict, code, mx_host, time.time()),
+        )
+
+
+class PatternStats(SQLiteStore):
+    """Counts of confirmed email patterns, globally and per top-level domain."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS pattern_stats (
+            scope TEXT NOT NULL,
+            pattern TEXT NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, pattern)
+        );
+    """
+
+    GLOBAL = "*"
+
+    def record_hit(self, pattern: str, domain: str) -> None:
+        """
+        Count a verified address built from the pattern.
+
+        Args:
+            pattern (str): The pattern of the verified address.
+            domain (str): The domain of the verified address.
+        """
+        self.executemany(
+            "INSERT INTO pattern_stats (scope, pattern, hits) VALUES (?, ?, 1) "
+            "ON CONFLICT (scope, pattern) DO UPDATE SET hits = hits + 1",
+            [(self.GLOBAL, pattern), (tld_scope(domain), pattern)],
+        )
+
+    def hits(self, scope: str) -> dict[str, int]:
+        """
+        Return the hit counts of every pattern in a scope.
+
+        Args:
+            scope (str): The scope, either "*" or "tld:<tld>".
+
+        Returns:
+            dict[str, int]: The hits per pattern.
+        """
+        rows = self.execute("SELECT pattern, hits FROM pattern_stats WHERE scope = ?", (scope,))
+        return dict(rows)
+
+    def rank(self, patterns: list, domain: str) -> list:
+        """
+        Order patterns by their empirical hit rate for the domain's TLD.
+
+        The TLD hit rate is smoothed towards the global one, and patterns
+        without data keep their original order. No pattern is dropped.
+
+        Args:
+            patterns (list): The candidate patterns in their default order.
+            domain (str): The domain the candidates are generated for.
+
+        Returns:
+            list: The deduplicated patterns, most likely first.
+        """
+        patterns = list(dict.fromkeys(patterns))
+        scores = self.scores(patterns, domain)
+        if scores is None:
+            return patterns
+        return sorted(patterns, key=lambda pattern: -scores[pattern])
+
+    def head_size(self, patterns: list, domain: str) -> int:
+        """
+        Count the leading patterns that cover most of the observed hits.
+
+        Until enough addresses have been confirmed, every pattern counts as
+        head. The rest is meant to be tried later, not dropped, so that
+        patterns with few hits can still gain some.
+
+        Args:
+            patterns (list): The patterns, most likely first.
+            domain (str): The domain the candidates are generated for.
+
+        Returns:
+            int: The number of leading patterns covering PATTERN_COVERAGE of
+            the score mass.
+        """
+        scores = self.scores(patterns, domain)
+        if scores is None or sum(self.hits(self.GLOBAL).values()) < PATTERN_MIN_OBSERVATIONS:
+            return len(patterns)
+        total = sum(scores.values())
+        if not total:
+            return len(patterns)
+        covered = 0.0
+        for size, pattern in enumerate(patterns):
+            if covered >= PATTERN_COVERAGE * total:
+                return size
+            covered += scores[pattern]
+        return len(patterns)
+
+    def scores(self, patterns: list, domain: str) -> dict[str, float] | None:
+        """
+        Score patterns by their TLD hit rate smoothed towards the global one.
+
+        Args:
+            patterns (list): The patterns to score.
+            domain (str): The domain the candidates are generated for.
+
+        Returns:
+            dict[str, float] | None: The score per pattern, or None if no
+            hits were recorded yet.
+        """
+        global_hits = self.hits(self.GLOBAL)
+        global_total = sum(global_hits.values())
+        if not global_total:
+            return None
+
+        tld_hits = self.hits(tld_scope(domain))
+        tld_total = sum(tld_hits.values())
+        return {
+            pattern: (
+                (tld_hits.get(pattern, 0) + PATTERN_TLD_WEIGHT * global_hits.get(pattern, 0) / global_total)
+                / (tld_total + PATTERN_TLD_WEIGHT)
+            )
+            for pattern in patterns
+        }
+
+
+class DomainFacts(SQLiteStore):
+    """Facts learned about a mail domain: its confirmed pattern, catch-all verdict and role address."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS domain_facts (
+            domain TEXT PRIMARY KEY,
+            pattern TEXT,
+            confirmations INTEGER NOT NULL DEFAULT 0,
+            contradictions INTEGER NOT NULL DEFAULT 0,
+            catch_all INTEGER,
+            catch_all_checked_at REAL,
+            role_email TEXT,
+            role_checked_at REAL
+        );
+    """
+    added_columns = (
+        ("domain_facts", "role_email", "TEXT"),
+        ("domain_facts", "role_checked_at", "REAL"),
+    )
+
+    def get(self, domain: str) -> dict:
+        """
+        Return everything known about a domain.
+
+        Args:
+            domain (str): The domain name.
+
+        Returns:
+            dict: The stored columns, empty if the domain is unknown.
+        """
+        with self._lock:
+            connection = self._connect()
+            cursor = connection.execute(
+                "SELECT * FROM domain_facts WHERE domain = ?", (domain.lower(),)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return {}
+            return dict(zip([column[0] for column in cursor.description], row))
+
+    def record_pattern(self, domain: str, pattern: str) -> None:
+        """
+        Record the pattern of a verified address at the domain.
+
+        A matching pattern adds a confirmation, a different one a
+        contradiction. The stored pattern is replaced by a contradicting one
+        once contradictions have caught up with confirmations.
+
+        Args:
+            domain (str): The domain name.
+            pattern (str): The pattern of the verified address.
+        """
+        with self._lock:
+            facts = self.get(domain)
+            stored = facts.get("pattern")
+            confirmations = facts.get("confirmations", 0)
+            contradictions = facts.get("contradictions", 0)
+            if stored == pattern:
+                confirmations += 1
+            elif stored and contradictions < confirmations:
+                pattern = stored
+                contradictions += 1
+            else:
+                confirmations, contradictions = 1, 0
+            self.execute(
+                "INSERT INTO domain_facts (domain, pattern, confirmations, contradictions) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (domain) DO UPDATE SET "
+                "pattern = excluded.pattern, confirmations = excluded.confirmations, "
+                "contradictions = excluded.contradictions",
+                (domain.lower(), pattern, confirmations, contradictions),
+            )
+
+    def trusted_pattern(self, domain: str) -> str | None:
+        """
+        Return the domain's pattern if it is confirmed often enough to skip probing.
+
+        Args:
+            domain (str): The domain name.
+
+        Returns:
+            str | None: The trusted pattern, or None.
+        """
+        facts = self.get(domain)
+        confirmations = facts.get("confirmations", 0)
+        if not facts.get("pattern") or confirmations < DOMAIN_PATTERN_MIN_CONFIRMATIONS:
+            return None
+        confidence = confirmations / (confirmations + facts["contradictions"])
+        if confidence < DOMAIN_PATTERN_MIN_CONFIDENCE:
+            return None
+        return facts["pattern"]
+
+    def get_catch_all(self, domain: str) -> bool | None:
+        """
+        Return a fresh catch-all verdict for the domain.
+
+        Args:
+            domain (str): The domain name.
+
+        Returns:
+            bool | None: The stored verdict, or None if unknown or stale.
+        """
+        facts = self.get(domain)
+        if facts.get("catch_all") is None or time.time() - facts["catch_all_checked_at"] > CATCH_ALL_TTL:
+            return None
+        return bool(facts["catch_all"])
+
+    def set_catch_all(self, domain: str, verdict: bool) -> None:
+        """
+        Store the catch-all verdict of a domain.
+
+        Args:
+            domain (str): The domain name.
+            verdict (bool): Whether the domain accepts any recipient.
+        """
+        self.execute(
+            "INSERT INTO domain_facts (domain, catch_all, catch_all_checked_at) "
+            "VALUES (?, ?, ?) ON CONFLICT (domain) DO UPDATE SET "
+            "catch_all = excluded.catch_all, catch_all_checked_at = excluded.catch_all_checked_at",
+            (domain.lower(), int(verdict), time.time()),
+        )
+
+    def get_role_email(self, domain: str) -> str | None:
+        """
+        Return the fresh role address result of the domain.
+
+        Args:
+            domain (str): The domain name.
+
+        Returns:
+            str | None: The accepted role address, "" if the domain is known
+            to accept none, or None if unknown or stale.
+        """
+        facts = self.get(domain)
+        role_email = facts.get("role_email")
+        if role_email is None:
+            return None
+        ttl = ROLE_EMAIL_TTL if role_email else ROLE_EMAIL_NEGATIVE_TTL
+        if time.time() - facts["role_checked_at"] > ttl:
+            return None
+        return role_email
+
+    def set_role_email(self, domain: str, role_email: str | None) -> None:
+        """
+        Store the role address accepted by the domain, or that none was.
+
+        Args:
+            domain (str): The domain name.
+            role_email (str | None): The accepted role address, or None.
+        """
+        self.execute(
+            "INSERT INTO domain_facts (domain, role_email, role_checked_at) "
+            "VALUES (?, ?, ?) ON CONFLICT (domain) DO UPDATE SET "
+            "role_email = excluded.role_email, role_checked_at = excluded.role_checked_at",
+            (domain.lower(), role_email or "", time.time()),
+        )
+
+
+class LLMCache(SQLiteStore):
+    """Email candidates suggested by the LLM, keyed by normalized name and domain."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS llm_emails (
+            name TEXT NOT NULL,
+            domain TEXT NOT NULL,
+            emails TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (name, domain)
+        );
+    """
+
+    def get(self, name: str, domain: str) -> list | None:
+        """
+        Return the cached candidates for a prospect.
+
+        Args:
+            name (str): The normalized name of the person.
+            domain (str): The domain name.
+
+        Returns:
+            list | None: The cached email addresses, or None on a miss.
+        """
+        rows = self.execute(
+            "SELECT emails FROM llm_emails WHERE name = ? AND domain = ?",
+            (name, domain.lower()),
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def put(self, name: str, domain: str, emails: list) -> None:
+        """
+        Cache the candidates suggested for a prospect.
+
+        Args:
+            name (str): The normalized name of the person.
+            domain (str): The domain name.
+            emails (list): The suggested email addresses.
+        """
+        self.execute(
+            "INSERT OR REPLACE INTO llm_emails VALUES (?, ?, ?, ?)",
+            (name, domain.lower(), json.dumps(emails), time.time()),
+        )
+
+
+class CompanySiteCache(SQLiteStore):
+    """Official sites and base domains of companies, keyed by normalized name."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS company_sites (
+            company TEXT PRIMARY KEY,
+            site TEXT,
+            domain TEXT,
+            checked_at REAL NOT NULL
+        );
+    """
+
+    def get(self, company: str) -> tuple | None:
+        """
+        Return the fresh cached site of a company.
+
+        Args:
+            company (str): The normalized company name.
+
+        Returns:
+            tuple | None: (site, domain), both None for a company known to
+            have no site, or None if the company is unknown or stale.
+        """
+        rows = self.execute(
+            "SELECT site, domain, checked_at FROM company_sites WHERE company = ?",
+            (company,),
+        )
+        if not rows:
+            return None
+        site, domain, checked_at = rows[0]
+        ttl = COMPANY_SITE_TTL if site else COMPANY_SITE_NEGATIVE_TTL
+        if time.time() - checked_at > ttl:
+            return None
+        return site, domain
+
+    def put(self, company: str, site: str | None, domain: str | None) -> None:
+        """
+        Cache the site of a company, or the fact that none was found.
+
+        Args:
+            company (str): The normalized company name.
+            site (str | None): The official site URL.
+            domain (str | None): The base domain of the site.
+        """
+        self.execute(
+            "INSERT OR REPLACE INTO company_sites VALUES (?, ?, ?, ?)",
+            (company, site, domain, time.time()),
+        )
+
+
+class CSEQuota(SQLiteStore):
+    """Daily Custom Search query budget shared by every caller.
+
+    Usage is counted per Pacific-time day, when Google resets the quota, in
+    total and per scope (e.g. "company", "position:EHS", "location:Berlin").
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS cse_usage (
+            day TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            queries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, scope)
+        );
+    """
+
+    TOTAL = "*"
+
+    def __init__(self, path: str = CACHE_DB, daily_limit: int = CSE_DAILY_LIMIT, budgets: dict = CSE_QUERY_BUDGETS):
+        super().__init__(path)
+        self.daily_limit = daily_limit
+        self.budgets = dict(budgets)
+
+    def acquire(self, *scopes: str) -> bool:
+        """
+        Reserve one query if neither the daily limit nor a scope budget is spent.
+
+        Args:
+            *scopes (str): The scopes the query is charged to.
+
+        Returns:
+            bool: True if the query may be sent, False if the quota is spent.
+        """
+        day = self.today()
+        with self._lock:
+            if self.used(self.TOTAL) >= self.daily_limit:
+                return False
+            for scope in scopes:
+                budget = self.budgets.get(scope)
+                if budget is not None and self.used(scope) >= budget:
+                    print(f"Query budget for {scope} is spent.")
+                    return False
+            self.executemany(
+                "INSERT INTO cse_usage (day, scope, queries) VALUES (?, ?, 1) "
+                "ON CONFLICT (day, scope) DO UPDATE SET queries = queries + 1",
+                [(day, scope) for scope in (self.TOTAL, *scopes)],
+            )
+            return True
+
+    def exhaust(self) -> None:
+        """
+        Mark today's quota as spent, e.g. after the API answered 429.
+        """
+        self.execute(
+            "INSERT INTO cse_usage (day, scope, queries) VALUES (?, ?, ?) "
+            "ON CONFLICT (day, scope) DO UPDATE SET queries = MAX(queries, excluded.queries)",
+            (self.today(), self.TOTAL, self.daily_limit),
+        )
+
+    def used(self, scope: str = TOTAL) -> int:
+        """
+        Return the number of queries charged to a scope today.
+
+        Args:
+            scope (str, optional): The scope. Defaults to the total.
+
+        Returns:
+            int: The number of queries.
+        """
+        rows = self.execute(
+            "SELECT queries FROM cse_usage WHERE day = ? AND scope = ?",
+            (self.today(), scope),
+        )
+        return rows[0][0] if rows else 0
+
+    def remaining(self) -> int:
+        """
+        Return the number of queries left today.
+
+        Returns:
+            int: The remaining daily queries.
+        """
+        return max(self.daily_limit - self.used(), 0)
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now(ZoneInfo("America/Los_Angeles")).date().isoformat()
+
+
+class ProspectIndex(SQLiteStore):
+    """Local replica of the CRM prospects' names, emails and LinkedIn URLs per instance."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS crm_prospects (
+            instance TEXT NOT NULL,
+            id TEXT NOT NULL,
+            name TEXT,
+            email TEXT,
+            linkedin TEXT,
+            modified_at TEXT,
+            PRIMARY KEY (instance, id)
+        );
+        CREATE INDEX IF NOT EXISTS crm_prospects_name ON crm_prospects (instance, name);
+        CREATE INDEX IF NOT EXISTS crm_prospects_email ON crm_prospects (instance, email);
+        CREATE INDEX IF NOT EXISTS crm_prospects_linkedin ON crm_prospects (instance, linkedin);
+        CREATE TABLE IF NOT EXISTS crm_sync (
+            instance TEXT PRIMARY KEY,
+            modified_at TEXT,
+            full_sync_at REAL NOT NULL
+        );
+    """
+
+    def upsert(self, instance: str, records: list) -> None:
+        """
+        Insert or refresh prospects of an instance.
+
+        Args:
+            instance (str): The CRM instance URL.
+            records (list): Prospect records with id, name, emailAddress,
+                linkedIn and modifiedAt.
+        """
+        self.executemany(
+            "INSERT OR REPLACE INTO crm_prospects VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    instance,
+                    record["id"],
+                    normalize_person_name(record.get("name")),
+                    normalize_address(record.get("emailAddress") or "") or None,
+                    normalize_url(record.get("linkedIn")),
+                    record.get("modifiedAt"),
+                )
+                for record in records
+            ],
+        )
+
+    def remove(self, instance: str, entity_id: str) -> None:
+        """
+        Drop a prospect that was deleted from the instance.
+
+        Args:
+            instance (str): The CRM instance URL.
+            entity_id (str): The prospect ID.
+        """
+        self.execute("DELETE FROM crm_prospects WHERE instance = ? AND id = ?", (instance, entity_id))
+
+    def find(self, instance: str, name: str | None = None, email: str | None = None, linkedin: str | None = None) -> list:
+        """
+        Return the IDs of prospects matching all given attributes.
+
+        Args:
+            instance (str): The CRM instance URL.
+            name (str | None, optional): The prospect name.
+            email (str | None, optional): The email address.
+            linkedin (str | None, optional): The LinkedIn profile URL.
+
+        Returns:
+            list: The matching prospect IDs.
+        """
+        conditions, params = ["instance = ?"], [instance]
+        for column, value in (
+            ("name", normalize_person_name(name)),
+            ("email", normalize_address(email) if email else None),
+            ("linkedin", normalize_url(linkedin)),
+        ):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        rows = self.execute(
+            f"SELECT id FROM crm_prospects WHERE {' AND '.join(conditions)}", tuple(params)
+        )
+        return [row[0] for row in rows]
+
+    def sync_state(self, instance: str) -> tuple | None:
+        """
+        Return the sync watermark of an instance.
+
+        Args:
+            instance (str): The CRM instance URL.
+
+        Returns:
+            tuple | None: (latest modifiedAt seen, time of the last full
+            load), or None if the instance was never loaded.
+        """
+        rows = self.execute(
+            "SELECT modified_at, full_sync_at FROM crm_sync WHERE instance = ?", (instance,)
+        )
+        return rows[0] if rows else None
+
+    def set_sync_state(self, instance: str, modified_at: str | None, full_sync_at: float) -> None:
+        """
+        Store the sync watermark of an instance.
+
+        Args:
+            instance (str): The CRM instance URL.
+            modified_at (str | None): The latest modifiedAt seen.
+            full_sync_at (float): The time of the last full load.
+        """
+        self.execute(
+            "INSERT OR REPLACE INTO crm_sync VALUES (?, ?, ?)", (instance, modified_at, full_sync_at)
+        )
+
+    def prune(self, instance: str, keep_ids: set) -> None:
+        """
+        Drop the prospects of an instance that a full reload did not return.
+
+        Args:
+            instance (str): The CRM instance URL.
+            keep_ids (set): The IDs returned by the full reload.
+        """
+        rows = self.execute("SELECT id FROM crm_prospects WHERE instance = ?", (instance,))
+        self.executemany(
+            "DELETE FROM crm_prospects WHERE instance = ? AND id = ?",
+            [(instance, row[0]) for row in rows if row[0] not in keep_ids],
+        )
+
+
+class ImportCheckpoint(SQLiteStore):
+    """Source prospect IDs already imported into each CRM instance."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS imported_prospects (
+            source_id TEXT NOT NULL,
+            instance TEXT NOT NULL,
+            crm_id TEXT,
+            imported_at REAL NOT NULL,
+            PRIMARY KEY (source_id, instance)
+        );
+    """
+
+    def __init__(self, path: str = IMPORT_CHECKPOINT_DB):
+        super().__init__(path)
+
+    def imported(self, instance: str) -> set:
+        """
+        Return the source IDs already handled for an instance.
+
+        Args:
+            instance (str): The CRM instance URL.
+
+        Returns:
+            set: The source prospect IDs.
+        """
+        rows = self.execute("SELECT source_id FROM imported_prospects WHERE instance = ?", (instance,))
+        return {row[0] for row in rows}
+
+    def mark(self, source_id: str, instance: str, crm_id: str | None) -> None:
+        """
+        Record that a source prospect landed in an instance.
+
+        Args:
+            source_id (str): The prospect ID in the export.
+            instance (str): The CRM instance URL.
+            crm_id (str | None): The created record ID, or None if the
+                prospect already existed there.
+        """
+        self.execute(
+            "INSERT OR REPLACE INTO imported_prospects VALUES (?, ?, ?, ?)",
+            (source_id, instance, crm_id, time.time()),
+        )
+
+
+class VerificationJournal(SQLiteStore):
+    """Work journal of an email_verificator run, so an interrupted run can resume."""
+
+    PENDING = "pending"
+    CANDIDATES = "candidates"
+    VERIFIED = "verified"
+    DONE = "done"
+    FAILED = "failed"
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS journal_prospects (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            email_db TEXT,
+            email_address TEXT,
+            state TEXT NOT NULL,
+            candidates TEXT,
+            email TEXT,
+            result TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS journal_prospects_state ON journal_prospects (state);
+        CREATE TABLE IF NOT EXISTS journal_run (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    added_columns = (
+        ("journal_prospects", "attempts", "INTEGER NOT NULL DEFAULT 0"),
+    )
+
+    def __init__(
+        self,
+        path: str = VERIFY_JOURNAL_DB,
+        max_attempts: int = VERIFY_JOURNAL_MAX_ATTEMPTS,
+        failed_ttl: float = VERIFY_JOURNAL_FAILED_TTL,
+    ):
+        super().__init__(path)
+        self.max_attempts = max_attempts
+        self.failed_ttl = failed_ttl
+
+    def add(self, prospect: dict) -> dict:
+        """
+        Journal a fetched prospect as pending and move the fetch watermark past it.
+
+        Both writes are committed together, so the watermark never runs
+        ahead of the journal. A prospect journaled as done by an earlier
+        pass is fetched again only if it is still unchecked in the CRM, so
+        it is reset to pending. A prospect that was given up on stays failed
+        for failed_ttl seconds, then it is reset to pending with its attempts
+        cleared, so a lasting outage does not skip it forever.
+
+        Args:
+            prospect (dict): The CRM record with id, name, emailDb and emailAddress.
+
+        Returns:
+            dict: The journal entry of the prospect.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT INTO journal_prospects (id, name, email_db, email_address, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "name = excluded.name, email_db = excluded.email_db, "
+                "email_address = excluded.email_address, state = excluded.state, "
+                "candidates = NULL, email = NULL, result = NULL, attempts = 0, "
+                "updated_at = excluded.updated_at "
+                "WHERE state = ? OR (state = ? AND updated_at < ?)",
+                (
+                    prospect["id"],
+                    prospect.get("name"),
+                    prospect.get("emailDb"),
+                    prospect.get("emailAddress"),
+                    self.PENDING,
+                    time.time(),
+                    self.DONE,
+                    self.FAILED,
+                    time.time() - self.failed_ttl,
+                ),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO journal_run VALUES ('watermark', ?)", (prospect["id"],)
+            )
+            connection.commit()
+            return self.get(prospect["id"])
+
+    def get(self, prospect_id: str) -> dict | None:
+        """
+        Return the journal entry of a prospect.
+
+        Args:
+            prospect_id (str): The prospect ID.
+
+        Returns:
+            dict | None: The entry with the keys of the CRM record plus
+            state, candidates, email and result, or None.
+        """
+        rows = self.execute(
+            "SELECT id, name, email_db, email_address, state, candidates, email, result "
+            "FROM journal_prospects WHERE id = ?",
+            (prospect_id,),
+        )
+        return self._entry(rows[0]) if rows else None
+
+    def unfinished(self) -> list:
+        """
+        Return the journaled prospects that are not done yet, in fetch order.
+
+        Returns:
+            list: The journal entries.
+        """
+        rows = self.execute(
+            "SELECT id, name, email_db, email_address, state, candidates, email, result "
+            "FROM journal_prospects WHERE state NOT IN (?, ?) ORDER BY id",
+            (self.DONE, self.FAILED),
+        )
+        return [self._entry(row) for row in rows]
+
+    def fail(self, prospect_id: str) -> bool:
+        """
+        Count a failed attempt and give up on the prospect after too many.
+
+        Args:
+            prospect_id (str): The prospect ID.
+
+        Returns:
+            bool: True if the prospect was given up on and is marked failed.
+        """
+        with self._lock:
+            self.execute(
+                "UPDATE journal_prospects SET attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (time.time(), prospect_id),
+            )
+            self.execute(
+                "UPDATE journal_prospects SET state = ? WHERE id = ? AND attempts >= ?",
+                (self.FAILED, prospect_id, self.max_attempts),
+            )
+            entry = self.get(prospect_id)
+            return bool(entry) and entry["state"] == self.FAILED
+
+    def advance(self, prospect_id: str, state: str, **fields) -> None:
+        """
+        Move a prospect to the next state and store what that step produced.
+
+        Args:
+            prospect_id (str): The prospect ID.
+            state (str): The new state.
+            **fields: Values of candidates, email and result to store.
+        """
+        columns = ["state = ?", "updated_at = ?"]
+        params = [state, time.time()]
+        for column in ("candidates", "email", "result"):
+            if column in fields:
+                columns.append(f"{column} = ?")
+                params.append(json.dumps(fields[column]))
+        self.execute(
+            f"UPDATE journal_prospects SET {', '.join(columns)} WHERE id = ?",
+            (*params, prospect_id),
+        )
+
+    def watermark(self) -> str | None:
+        """
+        Return the ID of the last prospect fetched by the current run.
+
+        Returns:
+            str | None: The prospect ID, or None if the run has not started.
+        """
+        rows = self.execute("SELECT value FROM journal_run WHERE key = 'watermark'")
+        return rows[0][0] if rows else None
+
+    def finish_fetch(self) -> None:
+        """
+        Start the next run from the first prospect once the fetch is exhausted.
+
+        The watermark, the done prospects and the failed prospects older than
+        failed_ttl are dropped; unfinished and recently failed prospects are
+        kept, so they are resumed or skipped.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "DELETE FROM journal_prospects WHERE state = ? OR (state = ? AND updated_at < ?)",
+                (self.DONE, self.FAILED, time.time() - self.failed_ttl),
+            )
+            connection.execute("DELETE FROM journal_run")
+            connection.commit()
+
+    @staticmethod
+    def _entry(row: tuple) -> dict:
+        prospect_id, name, email_db, email_address, state, candidates, email, result = row
+        return {
+            "id": prospect_id,
+            "name": name,
+            "emailDb": email_db,
+            "emailAddress": email_address,
+            "state": state,
+            "candidates": json.loads(candidates) if candidates else None,
+            "email": json.loads(email) if email else None,
+            "result": json.loads(result) if result else None,
+        }
+
+
+def tld_scope(domain: str) -> str:
+    """
+    Return the pattern statistics scope of a domain's top-level domain.
+
+    Args:
+        domain (str): The domain name.
+
+    Returns:
+        str: The scope key, e.g. "tld:de".
+    """
+    return "tld:" + domain.lower().rsplit(".", 1)[-1]
+
+
+def normalize_address(email: str) -> str:
+    """
+    Normalize an email address for use as a cache key.
+
+    Args:
+        email (str): The email address.
+
+    Returns:
+        str: The stripped, lower-cased address.
+    """
+    return email.strip().lower()
+
+
+def normalize_person_name(name: str | None) -> str | None:
+    """
+    Normalize a person's name for exact, case-insensitive lookups.
+
+    Args:
+        name (str | None): The name.
+
+    Returns:
+        str | None: The lower-cased name with collapsed whitespace.
+    """
+    if not name:
+        return None
+    return " ".join(name.lower().split())
+
+
+def normalize_url(url: str | None) -> str | None:
+    """
+    Normalize a profile URL so scheme, host prefix, query and trailing slash do not matter.
+
+    Args:
+        url (str | None): The URL.
+
+    Returns:
+        str | None: The lower-cased URL without those parts.
+    """
+    if not url:
+        return None
+    url = url.strip().lower().split("://", 1)[-1].split("?", 1)[0]
+    if "linkedin.com/" in url:
+        url = "linkedin.com/" + url.split("linkedin.com/", 1)[1]
+    if url.startswith("www."):
+        url = url[4:]
+    return url.rstrip("/")
+
+
+verification_store = VerificationStore()
+pattern_stats = PatternStats()
+domain_facts = DomainFacts()
+llm_cache = LLMCache()
+company_sites = CompanySiteCache()
+cse_quota = CSEQuota()
+prospect_index = ProspectIndex()
+import_checkpoint = ImportCheckpoint()
+verification_journal = VerificationJournal()